@@ -0,0 +1,165 @@
+"""A stand-in for an Apex Classic which replays a capture recorded by the integration.
+
+Serves the status documents of a capture at the times they were recorded, sped up by
+`speed`, and answers each download after as long as the Apex took to answer it, sped
+up the same way. Downloads which failed in the capture fail again. With a speed of 0
+each download is served the next document of the capture straight away instead.
+Outlet commands are accepted and counted.
+
+Captures are recorded by turning on the integration's capture option.
+
+Run on its own with: python benchmarks/apex_replay.py CAPTURE --port 8080 [--speed N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from bisect import bisect_right
+from pathlib import Path
+from time import monotonic
+
+from aiohttp import web
+from apex_simulator import SimulatorStats
+from common import load_integration
+
+capture = load_integration("capture")
+
+
+class ApexReplay:
+    """Serve the status documents of a capture in the order and at the pace recorded."""
+
+    def __init__(self, records: list, speed: float) -> None:
+        """Initialize the replay of a capture's records."""
+        self.speed = speed
+        self.stats = SimulatorStats()
+        self.statuses = [
+            record for record in records if record.kind == capture.CAPTURE_STATUS
+        ]
+        self.commands = [
+            record for record in records if record.kind == capture.CAPTURE_COMMAND
+        ]
+        self._offsets = [record.offset for record in self.statuses]
+        self._runner: web.AppRunner | None = None
+        # When the replay clock started, and the next document served at speed 0
+        self._started: float | None = None
+        self._next = 0
+
+    @property
+    def serial(self) -> str | None:
+        """Return the serial number in the first document which downloaded."""
+        for record in self.statuses:
+            if record.document is not None and "<serial>" in record.document:
+                start = record.document.index("<serial>") + len("<serial>")
+                return record.document[start : record.document.index("</serial>")]
+        return None
+
+    @property
+    def finished(self) -> bool:
+        """Return whether every status document of the capture has been served."""
+        if self.speed <= 0:
+            return self._next >= len(self.statuses)
+        return self._offsets[0] + self.replayed() >= self._offsets[-1]
+
+    def start_clock(self) -> None:
+        """Start replaying the capture's timeline from its first record."""
+        self._started = monotonic()
+
+    def replayed(self) -> float:
+        """Return how many seconds of the capture have been replayed."""
+        if self._started is None:
+            return 0.0
+        return (monotonic() - self._started) * self.speed
+
+    async def async_start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start serving and return the port the replay listens on."""
+        app = web.Application()
+        app.router.add_get("/cgi-bin/status.xml", self._handle_status)
+        app.router.add_post("/cgi-bin/status.cgi", self._handle_command)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    async def async_stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _current(self) -> capture.CaptureRecord:
+        """Pick the status record to answer a download with."""
+        if self.speed <= 0:
+            record = self.statuses[min(self._next, len(self.statuses) - 1)]
+            self._next += 1
+            return record
+        offset = self._offsets[0] + self.replayed()
+        return self.statuses[max(0, bisect_right(self._offsets, offset) - 1)]
+
+    async def _handle_status(self, _request: web.Request) -> web.Response:
+        """Serve the recorded document, after as long as the Apex took."""
+        self.stats.status_requests += 1
+        record = self._current()
+        if self.speed > 0:
+            await asyncio.sleep(record.duration / self.speed)
+        if record.document is None:
+            self.stats.errors += 1
+            return web.Response(status=500)
+        return web.Response(text=record.document, content_type="text/xml")
+
+    async def _handle_command(self, request: web.Request) -> web.Response:
+        """Accept an outlet command."""
+        self.stats.command_requests += 1
+        for key in await request.post():
+            if key.endswith("_state"):
+                self.stats.commands_received[key[: -len("_state")]] = monotonic()
+        return web.Response(text="")
+
+
+def load_replay(path: Path, speed: float) -> ApexReplay:
+    """Read a capture file and prepare its replay."""
+    _, records = capture.read_capture(path)
+    replay = ApexReplay(records, speed)
+    if not replay.statuses:
+        raise ValueError(f"{path} has no status downloads to replay")
+    return replay
+
+
+def add_replay_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options describing a replay to a command line parser."""
+    parser.add_argument("capture", type=Path, help="capture file to replay")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="how many times faster than recorded to replay, or 0 for no waiting",
+    )
+
+
+async def _serve(path: Path, speed: float, port: int) -> None:
+    """Serve a capture until it has all been replayed, or until interrupted."""
+    replay = load_replay(path, speed)
+    port = await replay.async_start("0.0.0.0", port)
+    print(
+        f"Replaying {len(replay.statuses)} status downloads of the Apex with serial "
+        f"{replay.serial} on port {port}"
+    )
+    replay.start_clock()
+    try:
+        while not replay.finished:
+            await asyncio.sleep(1)
+        print("Reached the end of the capture")
+        await asyncio.Event().wait()
+    finally:
+        await replay.async_stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_replay_arguments(parser)
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.capture, args.speed, args.port))
+    except KeyboardInterrupt:
+        pass
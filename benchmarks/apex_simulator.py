@@ -0,0 +1,185 @@
+"""A stand-in for an Apex Classic's web server, for benchmarking without a controller.
+
+Serves /cgi-bin/status.xml with the configured number of probes and outlets, and
+accepts outlet state changes posted to /cgi-bin/status.cgi. Responses can be delayed
+by a latency with random jitter, and fail at a configurable rate.
+
+Run on its own with: python benchmarks/apex_simulator.py --port 8080
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+import random
+from time import monotonic
+
+from aiohttp import web
+from common import status_xml
+
+# Values posted to status.cgi and the states they put outlets in
+_POSTED_STATES = {"0": "AON", "1": "OFF", "2": "ON"}
+
+
+@dataclass
+class SimulatorConfig:
+    """How the simulated Apex looks and behaves."""
+
+    probes: int = 24
+    outlets: int = 32
+    latency: float = 0.05
+    jitter: float = 0.02
+    error_rate: float = 0.0
+    serial: str = "AC4:12345"
+
+
+@dataclass
+class SimulatorStats:
+    """What the simulated Apex has been asked to do."""
+
+    status_requests: int = 0
+    command_requests: int = 0
+    errors: int = 0
+    # Time each outlet command was received, by outlet name
+    commands_received: dict[str, float] = field(default_factory=dict)
+
+
+class ApexSimulator:
+    """Serve realistic Apex Classic status documents and accept outlet commands."""
+
+    def __init__(self, config: SimulatorConfig) -> None:
+        """Initialize the simulator."""
+        self.config = config
+        self.stats = SimulatorStats()
+        self.tick = 0
+        self._runner: web.AppRunner | None = None
+        self._document = status_xml(config.probes, config.outlets, config.serial)
+        self._overrides: dict[str, str] = {}
+
+    def advance(self) -> None:
+        """Move the temperature readings on, as a real tank would between polls."""
+        self.tick += 1
+        self._render()
+
+    async def async_start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start serving and return the port the simulator listens on."""
+        app = web.Application()
+        app.router.add_get("/cgi-bin/status.xml", self._handle_status)
+        app.router.add_post("/cgi-bin/status.cgi", self._handle_command)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    async def async_stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _render(self) -> None:
+        """Rebuild the status document from the current tick and outlet states."""
+        document = status_xml(
+            self.config.probes, self.config.outlets, self.config.serial, self.tick
+        )
+        for name, state in self._overrides.items():
+            start = document.index(f"<name>{name}</name>")
+            state_start = document.index("<state>", start) + len("<state>")
+            state_end = document.index("</state>", state_start)
+            document = document[:state_start] + state + document[state_end:]
+        self._document = document
+
+    async def _respond(self) -> bool:
+        """Wait out the simulated latency and decide whether this request fails."""
+        delay = self.config.latency + random.uniform(
+            -self.config.jitter, self.config.jitter
+        )
+        await asyncio.sleep(max(0.0, delay))
+        if random.random() < self.config.error_rate:
+            self.stats.errors += 1
+            return False
+        return True
+
+    async def _handle_status(self, _request: web.Request) -> web.Response:
+        """Serve the status document."""
+        self.stats.status_requests += 1
+        if not await self._respond():
+            return web.Response(status=500)
+        return web.Response(text=self._document, content_type="text/xml")
+
+    async def _handle_command(self, request: web.Request) -> web.Response:
+        """Apply posted outlet states."""
+        self.stats.command_requests += 1
+        payload = await request.post()
+        if not await self._respond():
+            return web.Response(status=500)
+        for key, value in payload.items():
+            if key.endswith("_state") and value in _POSTED_STATES:
+                name = key[: -len("_state")]
+                self._overrides[name] = _POSTED_STATES[value]
+                self.stats.commands_received[name] = monotonic()
+        self._render()
+        return web.Response(text="")
+
+
+async def _serve(config: SimulatorConfig, port: int, tick_interval: float) -> None:
+    """Serve until interrupted, advancing the readings periodically."""
+    simulator = ApexSimulator(config)
+    port = await simulator.async_start("0.0.0.0", port)
+    print(f"Simulating an Apex with serial {config.serial} on port {port}")
+    try:
+        while True:
+            await asyncio.sleep(tick_interval)
+            simulator.advance()
+    finally:
+        await simulator.async_stop()
+
+
+def add_simulator_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options describing the simulated Apex to a command line parser."""
+    parser.add_argument("--probes", type=int, default=SimulatorConfig.probes)
+    parser.add_argument("--outlets", type=int, default=SimulatorConfig.outlets)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=SimulatorConfig.latency,
+        help="seconds the Apex takes to answer",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=SimulatorConfig.jitter,
+        help="seconds the latency randomly varies by",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=SimulatorConfig.error_rate,
+        help="fraction of requests answered with an error",
+    )
+
+
+def simulator_config(args: argparse.Namespace) -> SimulatorConfig:
+    """Build the simulator configuration from parsed command line options."""
+    return SimulatorConfig(
+        probes=args.probes,
+        outlets=args.outlets,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_simulator_arguments(parser)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--tick", type=float, default=10.0, help="seconds between reading changes"
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(simulator_config(args), args.port, args.tick))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,113 @@
+"""Micro-benchmark of the per-update cost of the integration's entities.
+
+Builds every entity for a synthetic Apex and measures the work Home Assistant does
+to write their state after a coordinator update: refreshing each entity from the
+coordinator and reading its identity, state, and attributes.
+
+Run with: python benchmarks/bench_entity_update.py [--probes N] [--outlets N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import timedelta
+from time import perf_counter
+
+from bs4 import BeautifulSoup
+from common import load_integration, status_xml
+from neptune_apex_classic.connection import ApexConnection
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import DeviceInfo
+
+
+def _read_entity(entity) -> None:
+    """Read everything Home Assistant reads from an entity when writing its state."""
+    if hasattr(entity, "_async_update_attrs"):
+        entity._async_update_attrs()
+    _ = (
+        entity.unique_id,
+        entity.name,
+        entity.device_info,
+        entity.available,
+        entity.state,
+        entity.extra_state_attributes,
+        entity.capability_attributes,
+        entity.state_attributes,
+    )
+
+
+async def main(probe_count: int, outlet_count: int, rounds: int) -> None:
+    """Build the entities for a synthetic Apex and time updating them."""
+    sensor = load_integration("sensor")
+    binary_sensor = load_integration("binary_sensor")
+    select = load_integration("select")
+    commands = load_integration("commands")
+    coordinator_module = load_integration("coordinator")
+    inventory_module = load_integration("inventory")
+    scheduler_module = load_integration("scheduler")
+    parser_module = load_integration("parser")
+
+    hass = HomeAssistant()
+    conn = ApexConnection("apex.invalid", None, None, None)
+    document = status_xml(probe_count, outlet_count)
+    conn._status_soup = BeautifulSoup(document, "xml")
+    readings = parser_module.ApexReadings()
+    status_parser = parser_module.StatusParser(readings)
+    status_parser.feed(document)
+    status_parser.close()
+    scheduler = scheduler_module.AdaptivePollScheduler(
+        timedelta(seconds=2), timedelta(seconds=60)
+    )
+    coordinator = coordinator_module.ApexDataUpdateCoordinator(
+        hass,
+        conn,
+        "Bench",
+        scheduler,
+        DeviceInfo(identifiers={("neptune_apex_classic", "AC4:12345")}, name="Bench"),
+    )
+    coordinator.data = coordinator._status
+    coordinator._status.update(readings, None)
+    inventory = inventory_module.ApexInventory.from_connection(conn)
+    queue = commands.ApexCommandQueue(hass, coordinator)
+
+    entities = []
+    for probe in inventory.probes:
+        cls = {
+            "Temp": sensor.ApexTempSensor,
+            "ORP": sensor.ApexORPSensor,
+            "Amps": sensor.ApexCurrentSensor,
+        }.get(probe.type, sensor.ApexSensor)
+        entities.append(cls(conn, coordinator, "Bench", "AC4:12345", probe))
+    for outlet in inventory.outlets:
+        entities.append(
+            binary_sensor.ApexOutlet(conn, coordinator, "Bench", "AC4:12345", outlet)
+        )
+        entities.append(
+            select.ApexOutletControl(
+                conn, coordinator, "Bench", "AC4:12345", outlet, queue
+            )
+        )
+    for entity in entities:
+        entity.hass = hass
+        entity.entity_id = f"{type(entity).__name__.lower()}.bench"
+
+    start = perf_counter()
+    for _ in range(rounds):
+        for entity in entities:
+            _read_entity(entity)
+    elapsed = perf_counter() - start
+
+    print(f"{len(entities)} entities, {rounds} updates")
+    print(f"per update: {elapsed / rounds * 1e6:.1f} us")
+    print(f"per entity write: {elapsed / rounds / len(entities) * 1e6:.2f} us")
+    await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--probes", type=int, default=24)
+    parser.add_argument("--outlets", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.probes, args.outlets, args.rounds))
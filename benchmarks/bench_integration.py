@@ -0,0 +1,294 @@
+"""Benchmark the integration end to end against a simulated Apex Classic.
+
+Starts a bare Home Assistant, sets up an Apex entry pointing at apex_simulator.py,
+and reports:
+
+  * setup time: how long async_setup_entry and the entity platforms take
+  * per-poll CPU time: Home Assistant thread CPU spent on each coordinator update
+  * state writes per poll: how many entities write state on each update
+  * command latency: how long selecting an outlet state takes to show in Home
+    Assistant and to reach the Apex
+
+It also changes an outlet once more and fails if the outlet change event fired for it
+doesn't carry the change as its data.
+
+The simulator runs on its own thread and event loop so its CPU time is not counted.
+
+Run with: python benchmarks/bench_integration.py [--polls N] [--latency S] ...
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Callable
+import json
+from pathlib import Path
+import statistics
+import tempfile
+import threading
+from time import monotonic, perf_counter, thread_time
+
+from apex_simulator import (
+    ApexSimulator,
+    add_simulator_arguments,
+    simulator_config,
+)
+from common import DOMAIN, apex_config_entry, async_start_hass, load_integration
+
+from homeassistant.const import ATTR_NAME, EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, callback
+
+const = load_integration("const")
+
+
+class SimulatorThread:
+    """Run an ApexSimulator on a separate thread with its own event loop."""
+
+    def __init__(self, simulator: ApexSimulator) -> None:
+        """Initialize the thread."""
+        self.simulator = simulator
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def start(self) -> int:
+        """Start the simulator and return its port."""
+        self._thread.start()
+        return asyncio.run_coroutine_threadsafe(
+            self.simulator.async_start(), self.loop
+        ).result()
+
+    def advance(self) -> None:
+        """Move the simulated readings on."""
+        self.loop.call_soon_threadsafe(self.simulator.advance)
+
+    def stop(self) -> None:
+        """Stop the simulator and its thread."""
+        asyncio.run_coroutine_threadsafe(
+            self.simulator.async_stop(), self.loop
+        ).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+def _count_state_writes(hass: HomeAssistant) -> list[int]:
+    """Count every state write Home Assistant receives, changed or not."""
+    counter = [0]
+    async_set = hass.states.async_set
+
+    def counting_async_set(*args, **kwargs):
+        counter[0] += 1
+        return async_set(*args, **kwargs)
+
+    hass.states.async_set = counting_async_set
+    return counter
+
+
+async def _measure_setup(hass: HomeAssistant, port: int) -> tuple[float, object]:
+    """Set up an Apex entry and return how long it took, and the entry."""
+    entry = apex_config_entry(f"127.0.0.1:{port}")
+    start = perf_counter()
+    await hass.config_entries.async_add(entry)
+    await hass.async_block_till_done()
+    return perf_counter() - start, entry
+
+
+async def _measure_polls(
+    hass: HomeAssistant, sim: SimulatorThread, coordinator, polls: int
+) -> tuple[list[float], list[int], list[float]]:
+    """Run coordinator updates and measure CPU time, state writes, and wall time of each."""
+    writes = _count_state_writes(hass)
+    cpu_times, write_counts, wall_times = [], [], []
+    for index in range(polls):
+        # Let every other poll see moved readings, like a live tank
+        if index % 2:
+            sim.advance()
+            await asyncio.sleep(0.01)
+        # Let the connection's freshness window pass so the poll really downloads
+        await asyncio.sleep(coordinator.conn.freshness.total_seconds())
+        writes[0] = 0
+        cpu_start, wall_start = thread_time(), perf_counter()
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+        cpu_times.append(thread_time() - cpu_start)
+        wall_times.append(perf_counter() - wall_start)
+        write_counts.append(writes[0])
+    return cpu_times, write_counts, wall_times
+
+
+async def _measure_commands(
+    hass: HomeAssistant, sim: SimulatorThread, commands: int
+) -> tuple[list[float], list[float]]:
+    """Select outlet states and measure how long they take to show and to reach the Apex."""
+    selects = sorted(
+        state.entity_id
+        for state in hass.states.async_all("select")
+        if state.entity_id.startswith("select.")
+    )[:commands]
+    shown, delivered = [], []
+    shown_at: dict[str, float] = {}
+
+    @callback
+    def _state_changed(event: Event) -> None:
+        new_state = event.data["new_state"]
+        if new_state is not None and new_state.state == expected.get(
+            new_state.entity_id
+        ):
+            shown_at.setdefault(new_state.entity_id, monotonic())
+
+    expected: dict[str, str] = {}
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _state_changed)
+    for entity_id in selects:
+        option = "ON" if hass.states.get(entity_id).state != "ON" else "OFF"
+        expected[entity_id] = option
+        outlet_name = hass.states.get(entity_id).attributes["friendly_name"].split()[-4]
+        start = monotonic()
+        await hass.services.async_call(
+            "select",
+            "select_option",
+            {"entity_id": entity_id, "option": option},
+            blocking=True,
+        )
+        # Commands the simulator failed never arrive, and aren't counted
+        if await _wait_for(lambda: entity_id in shown_at):
+            shown.append(shown_at[entity_id] - start)
+        if await _wait_for(
+            lambda: outlet_name in sim.simulator.stats.commands_received
+        ):
+            delivered.append(
+                sim.simulator.stats.commands_received.pop(outlet_name) - start
+            )
+    unsub()
+    return shown, delivered
+
+
+async def _check_outlet_event(hass: HomeAssistant, coordinator) -> None:
+    """Change an outlet and check the event fired for it carries the change as data."""
+    events: list[Event] = []
+    unsub = hass.bus.async_listen(const.EVENT_OUTLET_CHANGED, events.append)
+    entity_id = min(hass.states.async_entity_ids("select"))
+    option = "ON" if hass.states.get(entity_id).state != "ON" else "OFF"
+    await hass.services.async_call(
+        "select",
+        "select_option",
+        {"entity_id": entity_id, "option": option},
+        blocking=True,
+    )
+    # Make sure a poll sees the outlet's new state
+    coordinator.conn.expire()
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    unsub()
+    if not events:
+        raise RuntimeError(f"No outlet change event fired after changing {entity_id}")
+    for event in events:
+        if not isinstance(event.data, dict) or set(event.data) != {
+            const.ATTR_SERIAL_NUMBER,
+            const.ATTR_OUTLET,
+            ATTR_NAME,
+            const.ATTR_OLD_STATE,
+            const.ATTR_NEW_STATE,
+        }:
+            raise RuntimeError(f"Outlet change event has bad data: {event.data!r}")
+        event.as_dict()
+
+
+async def _wait_for(condition: Callable[[], bool], timeout: float = 5.0) -> bool:
+    """Wait until a condition holds, giving up after a timeout."""
+    deadline = monotonic() + timeout
+    while not condition():
+        if monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.001)
+    return True
+
+
+def _summary(values: list[float], scale: float = 1000.0) -> dict[str, float]:
+    """Summarize a list of measurements, scaled (to milliseconds by default)."""
+    ordered = sorted(values)
+    if not ordered:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "mean": statistics.fmean(ordered) * scale,
+        "p50": ordered[len(ordered) // 2] * scale,
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * scale,
+        "max": ordered[-1] * scale,
+    }
+
+
+async def main(args: argparse.Namespace) -> dict:
+    """Run the benchmark and return its results."""
+    sim = SimulatorThread(ApexSimulator(simulator_config(args)))
+    port = sim.start()
+    # Simulated errors start once the entry is set up, so setup itself is measured
+    sim.simulator.config.error_rate = 0.0
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(Path(config_dir))
+        setup_time, entry = await _measure_setup(hass, port)
+        sim.simulator.config.error_rate = args.error_rate
+        apex_data = hass.data[DOMAIN][entry.unique_id]
+        coordinator = apex_data["coordinator"]
+        entity_count = len(hass.states.async_all())
+
+        cpu_times, write_counts, wall_times = await _measure_polls(
+            hass, sim, coordinator, args.polls
+        )
+        shown, delivered = await _measure_commands(hass, sim, args.commands)
+        sim.simulator.config.error_rate = 0.0
+        await _check_outlet_event(hass, coordinator)
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_stop(force=True)
+
+    stats = sim.simulator.stats
+    sim.stop()
+    return {
+        "entities": entity_count,
+        "setup_ms": setup_time * 1000,
+        "poll_cpu_ms": _summary(cpu_times),
+        "poll_wall_ms": _summary(wall_times),
+        "state_writes_per_poll": _summary(write_counts, 1),
+        "command_shown_ms": _summary(shown),
+        "command_delivered_ms": _summary(delivered),
+        "status_requests": stats.status_requests,
+        "command_requests": stats.command_requests,
+        "simulated_errors": stats.errors,
+    }
+
+
+def _print_report(results: dict) -> None:
+    """Print the results as a readable table."""
+    print(f"entities:            {results['entities']}")
+    print(f"setup:               {results['setup_ms']:.1f} ms")
+    for key, label in [
+        ("poll_cpu_ms", "poll CPU (ms)"),
+        ("poll_wall_ms", "poll wall (ms)"),
+        ("state_writes_per_poll", "state writes/poll"),
+        ("command_shown_ms", "command shown (ms)"),
+        ("command_delivered_ms", "command sent (ms)"),
+    ]:
+        summary = results[key]
+        print(
+            f"{label + ':':<21}"
+            f"mean {summary['mean']:8.2f}  p50 {summary['p50']:8.2f}  "
+            f"p95 {summary['p95']:8.2f}  max {summary['max']:8.2f}"
+        )
+    print(
+        f"Apex requests:       {results['status_requests']} status, "
+        f"{results['command_requests']} commands, "
+        f"{results['simulated_errors']} simulated errors"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_simulator_arguments(parser)
+    parser.add_argument("--polls", type=int, default=50)
+    parser.add_argument("--commands", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    arguments = parser.parse_args()
+    benchmark_results = asyncio.run(main(arguments))
+    if arguments.json:
+        print(json.dumps(benchmark_results, indent=2))
+    else:
+        _print_report(benchmark_results)
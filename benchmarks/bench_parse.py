@@ -0,0 +1,134 @@
+"""Benchmark of the time and memory each poll spends parsing the status document.
+
+Compares parsing every document into soup and walking it, as polls did before
+status documents were parsed incrementally, with streaming each document through
+the integration's StatusParser into readings updated in place. First checks that the
+parser reports probes and outlets which came, went, or were renamed, including after
+a document which was cut off.
+
+Run with: python benchmarks/bench_parse.py [--probes N] [--outlets N]
+"""
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+from time import perf_counter
+import tracemalloc
+from xml.etree.ElementTree import ParseError
+
+from bs4 import BeautifulSoup
+from common import load_integration, status_xml
+
+
+def _soup_poll(document: bytes) -> None:
+    """Parse a document into soup and read every probe and outlet from it."""
+    soup = BeautifulSoup(document, "xml")
+    values = {}
+    for node in soup.find_all("probe"):
+        name, probe_type, value = (
+            node.find("name"),
+            node.find("type"),
+            node.find("value"),
+        )
+        values[f"{name.text}-{probe_type.text}"] = value.text
+    for node in soup.find_all("outlet"):
+        values[node.find("deviceID").text] = node.find("state").text
+
+
+def _streaming_poll(parser_module, chunk_size: int) -> Callable[[bytes], None]:
+    """Build a poll which streams documents into one set of readings."""
+    readings = parser_module.ApexReadings()
+
+    def poll(document: bytes) -> None:
+        parser = parser_module.StatusParser(readings)
+        for start in range(0, len(document), chunk_size):
+            parser.feed(document[start : start + chunk_size])
+        parser.close()
+
+    return poll
+
+
+def _check_inventory_changes(parser_module) -> None:
+    """Check the parser reports probes and outlets which came, went, or were renamed."""
+    readings = parser_module.ApexReadings()
+
+    def parse(document: str) -> bool:
+        parser = parser_module.StatusParser(readings)
+        parser.feed(document)
+        parser.close()
+        return readings.inventory_changed
+
+    document = status_xml(4, 4)
+    for description, next_document, expected in [
+        ("the first document", document, True),
+        ("an unchanged document", document, False),
+        ("a probe added", status_xml(5, 4), True),
+        ("a probe removed", document, True),
+        ("an outlet renamed", document.replace("Outlet1", "Heater"), True),
+        ("the rename repeated", document.replace("Outlet1", "Heater"), False),
+    ]:
+        if parse(next_document) != expected:
+            raise RuntimeError(f"Parser missed whether {description} changed inventory")
+
+    # A document cut off after a new probe leaves the readings as they were
+    document = status_xml(5, 4).replace("Outlet1", "Heater")
+    try:
+        parse(document[:-300])
+    except ParseError:
+        pass
+    if not parse(document):
+        raise RuntimeError("Parser missed a probe added after a document cut off")
+
+
+def _measure(name: str, poll: Callable[[bytes], None], documents: list[bytes]) -> None:
+    """Print the time and peak memory a poll takes for each document."""
+    poll(documents[0])
+    start = perf_counter()
+    for document in documents:
+        poll(document)
+    elapsed = perf_counter() - start
+
+    tracemalloc.start()
+    peaks = []
+    for document in documents:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        poll(document)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    print(
+        f"{name:>9}: {elapsed / len(documents) * 1e3:6.2f} ms per poll, "
+        f"peak {max(peaks) / 1024:7.1f} KiB allocated per poll"
+    )
+
+
+def main(probe_count: int, outlet_count: int, polls: int) -> None:
+    """Time parsing a series of status documents both ways."""
+    parser_module = load_integration("parser")
+    const = load_integration("const")
+    documents = [
+        status_xml(probe_count, outlet_count, tick=tick).encode()
+        for tick in range(polls)
+    ]
+
+    _check_inventory_changes(parser_module)
+    print(
+        f"{probe_count} probes, {outlet_count} outlets, "
+        f"{len(documents[0])} byte documents, {polls} polls"
+    )
+    _measure("soup", _soup_poll, documents)
+    _measure(
+        "streaming",
+        _streaming_poll(parser_module, const.STATUS_CHUNK_SIZE),
+        documents,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--probes", type=int, default=24)
+    parser.add_argument("--outlets", type=int, default=32)
+    parser.add_argument("--polls", type=int, default=200)
+    args = parser.parse_args()
+    main(args.probes, args.outlets, args.polls)
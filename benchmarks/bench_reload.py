@@ -0,0 +1,99 @@
+"""Benchmark reloading an Apex entry against a simulated Apex Classic.
+
+Sets up an entry pointing at apex_simulator.py, reloads it repeatedly, and reports:
+
+  * setup time: how long the first setup of the entry takes
+  * reload time: how long each reload takes until its entities are back
+  * status requests per reload: how many times each reload downloads the status
+  * entities after each reload, which should stay what the first setup created
+
+Each reload waits out the connection's freshness window first, so that its status
+download is really made rather than shared with the previous one.
+
+Run with: python benchmarks/bench_reload.py [--reloads N] [--latency S] ...
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import tempfile
+from time import perf_counter
+
+from apex_simulator import ApexSimulator, add_simulator_arguments, simulator_config
+from bench_integration import SimulatorThread, _summary
+from common import DOMAIN, apex_config_entry, async_start_hass
+
+from homeassistant.config_entries import ConfigEntryState
+
+
+async def main(args: argparse.Namespace) -> dict:
+    """Run the benchmark and return its results."""
+    sim = SimulatorThread(ApexSimulator(simulator_config(args)))
+    port = sim.start()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(Path(config_dir))
+        entry = apex_config_entry(f"127.0.0.1:{port}")
+        start = perf_counter()
+        await hass.config_entries.async_add(entry)
+        await hass.async_block_till_done()
+        setup_time = perf_counter() - start
+        entity_count = len(hass.states.async_all())
+
+        reload_times, requests, entity_counts = [], [], []
+        for _ in range(args.reloads):
+            coordinator = hass.data[DOMAIN][entry.unique_id]["coordinator"]
+            await asyncio.sleep(coordinator.conn.freshness.total_seconds())
+            status_requests = sim.simulator.stats.status_requests
+            start = perf_counter()
+            await hass.config_entries.async_reload(entry.entry_id)
+            await hass.async_block_till_done()
+            reload_times.append(perf_counter() - start)
+            requests.append(sim.simulator.stats.status_requests - status_requests)
+            entity_counts.append(len(hass.states.async_all()))
+            if entry.state != ConfigEntryState.LOADED:
+                raise RuntimeError(f"Entry is {entry.state} after reloading")
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_stop(force=True)
+
+    sim.stop()
+    return {
+        "entities": entity_count,
+        "setup_ms": setup_time * 1000,
+        "reload_ms": _summary(reload_times),
+        "status_requests_per_reload": _summary(requests, 1),
+        "entities_after_reload": _summary(entity_counts, 1),
+    }
+
+
+def _print_report(results: dict) -> None:
+    """Print the results as a readable table."""
+    print(f"entities:            {results['entities']}")
+    print(f"setup:               {results['setup_ms']:.1f} ms")
+    for key, label in [
+        ("reload_ms", "reload (ms)"),
+        ("status_requests_per_reload", "status requests"),
+        ("entities_after_reload", "entities after"),
+    ]:
+        summary = results[key]
+        print(
+            f"{label + ':':<21}"
+            f"mean {summary['mean']:8.2f}  p50 {summary['p50']:8.2f}  "
+            f"p95 {summary['p95']:8.2f}  max {summary['max']:8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_simulator_arguments(parser)
+    parser.add_argument("--reloads", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    arguments = parser.parse_args()
+    benchmark_results = asyncio.run(main(arguments))
+    if arguments.json:
+        print(json.dumps(benchmark_results, indent=2))
+    else:
+        _print_report(benchmark_results)
@@ -0,0 +1,152 @@
+"""Benchmark the integration against a capture of a real Apex's traffic.
+
+Replays a capture recorded with the integration's capture option through
+apex_replay.py, sets up an Apex entry against it, and polls once for every status
+download in the capture, at the times they were recorded sped up by `--speed` (or
+back to back with `--speed 0`). Outlet commands in the capture are sent again at
+their recorded times. Reports:
+
+  * setup time: how long async_setup_entry and the entity platforms take
+  * per-poll CPU time: Home Assistant thread CPU spent on each coordinator update
+  * state writes per poll: how many entities write state on each update
+  * command time: how long each replayed outlet command took to send
+
+The replay runs on its own thread and event loop so its CPU time is not counted.
+
+Run with: python benchmarks/bench_replay.py CAPTURE [--speed N] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import tempfile
+from time import perf_counter, thread_time
+
+from apex_replay import add_replay_arguments, load_replay
+from bench_integration import SimulatorThread, _count_state_writes, _summary
+from common import DOMAIN, apex_config_entry, async_start_hass
+
+from homeassistant.core import HomeAssistant
+
+
+async def _replay_commands(replay, conn) -> list[float]:
+    """Send the capture's outlet commands again at their recorded times."""
+    times = []
+    first = replay.statuses[0].offset
+    for record in replay.commands:
+        if replay.speed > 0:
+            await asyncio.sleep(
+                max(0.0, (record.offset - first) / replay.speed - replay.replayed())
+            )
+        start = perf_counter()
+        await conn.post_status_update(record.payload)
+        times.append(perf_counter() - start)
+    return times
+
+
+async def _replay_polls(
+    hass: HomeAssistant, replay, coordinator
+) -> tuple[list[float], list[int], list[float]]:
+    """Poll once for every status download in the capture and measure each update."""
+    writes = _count_state_writes(hass)
+    cpu_times, write_counts, wall_times = [], [], []
+    first = replay.statuses[0].offset
+    for record in replay.statuses[1:]:
+        if replay.speed > 0:
+            await asyncio.sleep(
+                max(0.0, (record.offset - first) / replay.speed - replay.replayed())
+            )
+        # Every poll downloads, however close together the recorded downloads were
+        coordinator.conn.expire()
+        writes[0] = 0
+        cpu_start, wall_start = thread_time(), perf_counter()
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+        cpu_times.append(thread_time() - cpu_start)
+        wall_times.append(perf_counter() - wall_start)
+        write_counts.append(writes[0])
+    return cpu_times, write_counts, wall_times
+
+
+async def main(args: argparse.Namespace) -> dict:
+    """Run the benchmark and return its results."""
+    replay = load_replay(args.capture, args.speed)
+    sim = SimulatorThread(replay)
+    port = sim.start()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(Path(config_dir))
+        entry = apex_config_entry(f"127.0.0.1:{port}", replay.serial or "AC4:00000")
+        start = perf_counter()
+        await hass.config_entries.async_add(entry)
+        await hass.async_block_till_done()
+        setup_time = perf_counter() - start
+        entity_count = len(hass.states.async_all())
+        coordinator = hass.data[DOMAIN][entry.unique_id]["coordinator"]
+
+        replay.start_clock()
+        replay_start = perf_counter()
+        (cpu_times, write_counts, wall_times), command_times = await asyncio.gather(
+            _replay_polls(hass, replay, coordinator),
+            _replay_commands(replay, coordinator.conn),
+        )
+        replay_time = perf_counter() - replay_start
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_stop(force=True)
+
+    stats = replay.stats
+    sim.stop()
+    return {
+        "entities": entity_count,
+        "setup_ms": setup_time * 1000,
+        "replay_s": replay_time,
+        "polls": len(cpu_times),
+        "poll_cpu_ms": _summary(cpu_times),
+        "poll_wall_ms": _summary(wall_times),
+        "state_writes_per_poll": _summary(write_counts, 1),
+        "command_ms": _summary(command_times),
+        "status_requests": stats.status_requests,
+        "command_requests": stats.command_requests,
+        "replayed_errors": stats.errors,
+    }
+
+
+def _print_report(results: dict) -> None:
+    """Print the results as a readable table."""
+    print(f"entities:            {results['entities']}")
+    print(f"setup:               {results['setup_ms']:.1f} ms")
+    print(
+        f"replay:              {results['polls']} polls in {results['replay_s']:.1f} s"
+    )
+    for key, label in [
+        ("poll_cpu_ms", "poll CPU (ms)"),
+        ("poll_wall_ms", "poll wall (ms)"),
+        ("state_writes_per_poll", "state writes/poll"),
+        ("command_ms", "command (ms)"),
+    ]:
+        summary = results[key]
+        print(
+            f"{label + ':':<21}"
+            f"mean {summary['mean']:8.2f}  p50 {summary['p50']:8.2f}  "
+            f"p95 {summary['p95']:8.2f}  max {summary['max']:8.2f}"
+        )
+    print(
+        f"Apex requests:       {results['status_requests']} status, "
+        f"{results['command_requests']} commands, "
+        f"{results['replayed_errors']} replayed errors"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_replay_arguments(parser)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    arguments = parser.parse_args()
+    benchmark_results = asyncio.run(main(arguments))
+    if arguments.json:
+        print(json.dumps(benchmark_results, indent=2))
+    else:
+        _print_report(benchmark_results)
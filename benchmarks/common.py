@@ -0,0 +1,135 @@
+"""Helpers shared by the benchmarks."""
+from __future__ import annotations
+
+import importlib.util
+from pathlib import Path
+import sys
+from types import ModuleType
+
+from homeassistant import config_entries
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import (
+    area_registry,
+    device_registry,
+    entity_registry,
+    issue_registry,
+)
+from homeassistant.helpers.entity import DATA_ENTITY_SOURCE
+from homeassistant.setup import async_setup_component
+
+COMPONENT_DIR = (
+    Path(__file__).resolve().parent.parent
+    / "custom_components"
+    / "neptune-apex-classic"
+)
+COMPONENT_PACKAGE = "custom_components.neptune_apex_classic"
+DOMAIN = "neptune_apex_classic"
+
+
+def load_integration(submodule: str | None = None) -> ModuleType:
+    """Import the integration, or one of its modules, as Home Assistant would."""
+    if COMPONENT_PACKAGE not in sys.modules:
+        _load_package()
+    if submodule is None:
+        return sys.modules[COMPONENT_PACKAGE]
+    return importlib.import_module(f"{COMPONENT_PACKAGE}.{submodule}")
+
+
+def _load_package() -> None:
+    """Import the integration's directory under the package name Home Assistant uses."""
+    spec = importlib.util.spec_from_file_location(
+        COMPONENT_PACKAGE,
+        COMPONENT_DIR / "__init__.py",
+        submodule_search_locations=[str(COMPONENT_DIR)],
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[COMPONENT_PACKAGE] = module
+    spec.loader.exec_module(module)
+
+
+def status_xml(
+    probe_count: int, outlet_count: int, serial: str = "AC4:12345", tick: int = 0
+) -> str:
+    """Build an Apex Classic status document with the given number of probes and outlets.
+
+    `tick` nudges the temperature readings so successive documents differ.
+    """
+    probe_types = ["Temp", "pH", "ORP", "Amps"]
+    probes = []
+    for index in range(probe_count):
+        probe_type = probe_types[index % len(probe_types)]
+        if probe_type == "Temp":
+            value = f"{77.0 + index * 0.1 + tick * 0.1:.1f}"
+        elif probe_type == "pH":
+            value = f"{8.10 + index * 0.01:.2f}"
+        elif probe_type == "ORP":
+            value = f"{350 + index}"
+        else:
+            value = f"{0.5 + index * 0.1:.1f}"
+        probes.append(
+            f"<probe><name>{probe_type}{index}</name>"
+            f"<value>{value}</value><type>{probe_type}</type></probe>"
+        )
+
+    outlets = []
+    for index in range(outlet_count):
+        state = ["AON", "AOF", "ON", "OFF"][index % 4]
+        outlets.append(
+            f"<outlet><name>Outlet{index}</name><outputID>{index}</outputID>"
+            f"<state>{state}</state><deviceID>{index // 8 + 1}_{index % 8 + 1}"
+            "</deviceID></outlet>"
+        )
+
+    return (
+        '<?xml version="1.0"?>'
+        '<status software="4.20_5B13" hardware="1.0">'
+        f"<hostname>apex</hostname><serial>{serial}</serial>"
+        "<timezone>-6.00</timezone><date>01/01/2023 12:00:00</date>"
+        "<power><failed>none</failed><restored>none</restored></power>"
+        f"<probes>{''.join(probes)}</probes>"
+        f"<outlets>{''.join(outlets)}</outlets>"
+        "</status>"
+    )
+
+
+async def async_start_hass(config_dir: Path) -> HomeAssistant:
+    """Start a bare Home Assistant which loads the integration from `config_dir`."""
+    link = config_dir / "custom_components" / DOMAIN
+    link.parent.mkdir(parents=True, exist_ok=True)
+    if not link.exists():
+        link.symlink_to(COMPONENT_DIR, target_is_directory=True)
+
+    hass = HomeAssistant()
+    hass.config.config_dir = str(config_dir)
+    hass.config.skip_pip = True
+    await area_registry.async_load(hass)
+    await device_registry.async_load(hass)
+    await entity_registry.async_load(hass)
+    await issue_registry.async_load(hass)
+    hass.data[DATA_ENTITY_SOURCE] = {}
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    await async_setup_component(hass, "homeassistant", {})
+    await hass.async_start()
+    return hass
+
+
+def apex_config_entry(
+    host: str, serial: str = "AC4:12345", options: dict | None = None
+) -> config_entries.ConfigEntry:
+    """Build a config entry for an Apex, as the config flow would create it."""
+    return config_entries.ConfigEntry(
+        version=1,
+        domain=DOMAIN,
+        title=serial,
+        data={
+            "host": host,
+            "name": f"Apex {serial}",
+            "username": "admin",
+            "password": "1234",
+            "serial-number": serial,
+        },
+        source=config_entries.SOURCE_USER,
+        options=options or {},
+        unique_id=serial,
+    )
@@ -1,7 +1,9 @@
 """Integration for classic Neptune Apex units."""
 from __future__ import annotations
 
+from datetime import timedelta
 import logging
+from time import monotonic
 
 from neptune_apex_classic.connection import ApexConnection
 
@@ -13,21 +15,61 @@ from homeassistant.const import (
     CONF_USERNAME,
     Platform,
 )
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.entity import DeviceInfo
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
 )
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import (
+    CONFIG_KEY_CAPTURE,
+    CONFIG_KEY_EXCLUDED,
+    CONFIG_KEY_HISTORY_INTERVAL,
+    CONFIG_KEY_LINE_VOLTAGE,
+    CONFIG_KEY_MAX_UPDATE_INTERVAL,
+    CONFIG_KEY_MIN_UPDATE_INTERVAL,
+    CONFIG_KEY_OPTIMISTIC_OUTLETS,
+    CONFIG_KEY_OPTIMISTIC_TIMEOUT,
+    CONFIG_KEY_REQUEST_TIMEOUT,
     CONFIG_KEY_SERIAL_NUMBER,
+    CONFIG_KEY_SLOW,
+    CONFIG_KEY_SLOW_INTERVAL,
+    CONFIG_KEY_STATUS_FRESHNESS,
+    CONFIG_KEY_THRESHOLDS,
+    DATA_KEY_COMMAND_QUEUE,
     DATA_KEY_CONNECTION,
     DATA_KEY_COORDINATOR,
+    DATA_KEY_INVENTORY,
+    DATA_KEY_PLATFORMS,
+    DATA_RELOADS,
+    DEFAULT_CAPTURE,
+    DEFAULT_HISTORY_INTERVAL,
+    DEFAULT_LINE_VOLTAGE,
+    DEFAULT_MAX_UPDATE_INTERVAL,
+    DEFAULT_MIN_UPDATE_INTERVAL,
+    DEFAULT_OPTIMISTIC_OUTLETS,
+    DEFAULT_OPTIMISTIC_TIMEOUT,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_SLOW_INTERVAL,
+    DEFAULT_STATUS_FRESHNESS,
     DOMAIN,
-    TIME_BETWEEN_UPDATES,
+    RELOAD_GRACE,
+    SIGNAL_INVENTORY_ADDED,
+    SIGNAL_INVENTORY_REMOVED,
 )
+from .cache import ApexStatusCache
+from .capture import ApexCaptureWriter
+from .commands import ApexCommandQueue
+from .connection import ManagedApexConnection, async_get_connection_manager
+from .coordinator import ApexDataUpdateCoordinator
+from .exporter import async_get_exporter
+from .inventory import ApexInventory
+from .logs import ApexLogImporter, async_remove_log_cursor
+from .scheduler import AdaptivePollScheduler
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -38,6 +80,7 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
     """Set up the entry for the Apex component."""
     hostname = config.data[CONF_HOST]
     serial_number = config.data[CONFIG_KEY_SERIAL_NUMBER]
+    start = monotonic()
     _LOGGER.info(
         "Setting up %s integration with host %s with ID %s",
         DOMAIN,
@@ -45,57 +88,339 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
         serial_number,
     )
 
-    session = async_get_clientsession(hass, False)
-    conn = ApexConnection(
-        hostname, session, config.data[CONF_USERNAME], config.data[CONF_PASSWORD]
-    )
+    # Pick up the connection and inventory kept by unloading this entry if it's being
+    # reloaded, so that reloading costs one status download rather than starting over
+    manager = async_get_connection_manager(hass)
+    kept = _async_reclaim(hass, serial_number)
+    if kept is not None and kept[0].hostname.lower() != hostname.lower():
+        # The entry moved to another host, so nothing kept applies any more
+        await manager.async_release(kept[0])
+        kept = None
+    if kept is not None:
+        conn, inventory = kept
+        conn.set_credentials(config.data[CONF_USERNAME], config.data[CONF_PASSWORD])
+    else:
+        conn = manager.async_acquire(
+            hostname, config.data[CONF_USERNAME], config.data[CONF_PASSWORD]
+        )
+        inventory = None
 
-    # Enable the state selection entities to allow controlling outlets
-    # if the configuration includes a username and password for authentication
-    if config.data[CONF_USERNAME] and config.data[CONF_PASSWORD]:
-        PLATFORMS.append(Platform.SELECT)
-
-    # Set up a DataUpdateCoordinator so as to not slam the poor Apex with requests
-    async def async_data_update() -> None:
-        await conn.refresh()
-
-    coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name=config.data[CONF_NAME],
-        update_interval=TIME_BETWEEN_UPDATES,
-        update_method=async_data_update,
-    )
+    # Setup isn't unloaded when it fails, so let go of the connection and capture
+    # before raising, or every retry would hold on to another reference to them
+    try:
+        # Set up a DataUpdateCoordinator so as to not slam the poor Apex with requests,
+        # polling faster only while something interesting is happening
+        scheduler = AdaptivePollScheduler(*_get_update_interval_bounds(config))
+        device_info = DeviceInfo(
+            identifiers={(DOMAIN, serial_number)},
+            name=config.data[CONF_NAME],
+            model="Apex Classic",
+            manufacturer="Neptune",
+        )
+        coordinator = ApexDataUpdateCoordinator(
+            hass, conn, config.data[CONF_NAME], scheduler, device_info
+        )
+        _apply_options(config, coordinator)
+        _async_apply_capture(hass, config, conn)
+        # A kept connection goes on with the exclusions its entities were created with,
+        # and catches up with the options once they are set up again
+        if inventory is None and conn.readings.excluded != _get_excluded(config):
+            conn.readings.excluded = _get_excluded(config)
+            conn.expire()
+
+        # Create the entities from the status saved by the last run if there is one,
+        # so that starting up doesn't wait on the Apex; they stay unavailable until it
+        # answers. Otherwise download the status once and parse the probes and outlets
+        # out of it once, rather than having each platform walk the status on its own
+        cache = ApexStatusCache(hass, serial_number)
+        document = None if conn.get_status() is not None else await cache.async_load()
+        if document is not None:
+            conn.load_status(document)
+            coordinator.async_load_cached()
+        else:
+            await coordinator.async_config_entry_first_refresh()
+        if inventory is None:
+            inventory = ApexInventory.from_connection(conn, conn.readings.excluded)
+        else:
+            # What changed doesn't matter, since entities are created from it next
+            inventory.update_from_connection(conn)
+    except Exception:
+        if conn.capture is not None:
+            await conn.capture.async_close()
+            conn.capture = None
+        await manager.async_release(conn)
+        raise
 
-    # Stash the ApexConnection and coordinator for access by individual sensors
+    # Stash the ApexConnection, coordinator, inventory, and outlet command queue
+    # for access by individual sensors, along with the platforms set up for the entry
+    platforms = _get_platforms(config)
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][serial_number] = {
         DATA_KEY_CONNECTION: conn,
         DATA_KEY_COORDINATOR: coordinator,
+        DATA_KEY_INVENTORY: inventory,
+        DATA_KEY_COMMAND_QUEUE: ApexCommandQueue(hass, coordinator),
+        DATA_KEY_PLATFORMS: platforms,
     }
 
-    await coordinator.async_config_entry_first_refresh()
-    await coordinator.async_refresh()
-    await hass.config_entries.async_forward_entry_setups(config, PLATFORMS)
+    await hass.config_entries.async_forward_entry_setups(config, platforms)
+    config.async_on_unload(config.add_update_listener(async_update_options))
+
+    @callback
+    def _async_handle_poll() -> None:
+        """Save the status, and add or retire entities for probes and outlets which came or went."""
+        cache.async_save(conn)
+        if (change := inventory.update_from_connection(conn)) is None:
+            return
+        _LOGGER.info(
+            "Apex at %s added %s probes and %s outlets and removed %s",
+            hostname,
+            len(change.probes),
+            len(change.outlets),
+            len(change.removed),
+        )
+        for key in change.removed:
+            async_dispatcher_send(
+                hass,
+                SIGNAL_INVENTORY_REMOVED.format(serial_number=serial_number, key=key),
+            )
+        if change.probes or change.outlets:
+            async_dispatcher_send(
+                hass,
+                SIGNAL_INVENTORY_ADDED.format(serial_number=serial_number),
+                change,
+            )
+
+    # Keep the saved status current for the next start, and follow the inventory
+    # without reloading when probes or outlets are added, removed, or renamed
+    cache.async_save(conn)
+    config.async_on_unload(coordinator.async_add_listener(_async_handle_poll))
+    # Serve the readings to monitoring from the coordinator instead of the Apex
+    config.async_on_unload(
+        async_get_exporter(hass).async_track(serial_number, coordinator)
+    )
+    if document is not None:
+        hass.async_create_task(coordinator.async_refresh())
+
+    # Fill in the statistics missed while Home Assistant wasn't running from the logs
+    # the Apex keeps itself
+    if "recorder" in hass.config.components:
+        importer = ApexLogImporter(hass, conn, config.data[CONF_NAME], serial_number)
+        import_task = hass.async_create_background_task(
+            importer.async_import(), f"{DOMAIN} log import {serial_number}"
+        )
+        config.async_on_unload(import_task.cancel)
+
+    # Catch a kept connection up with exclusions changed while it was reloading
+    await _async_apply_exclusions(config, hass.data[DOMAIN][serial_number])
 
+    _LOGGER.info(
+        "Set up Apex at %s with %s probes and %s outlets in %.3f seconds",
+        hostname,
+        len(inventory.probes),
+        len(inventory.outlets),
+        monotonic() - start,
+    )
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
     """Unload an Apex entry."""
-    unload_ok = await hass.config_entries.async_unload_platforms(config, PLATFORMS)
+    serial_number = config.data[CONFIG_KEY_SERIAL_NUMBER]
+    unload_ok = await hass.config_entries.async_unload_platforms(
+        config, hass.data[DOMAIN][serial_number][DATA_KEY_PLATFORMS]
+    )
     if unload_ok:
-        hass.data[DOMAIN].pop(config.data[CONFIG_KEY_SERIAL_NUMBER])
+        apex_data = hass.data[DOMAIN].pop(serial_number)
+        coordinator = apex_data[DATA_KEY_COORDINATOR]
+        coordinator.fleet.async_remove(coordinator)
+        await apex_data[DATA_KEY_COMMAND_QUEUE].async_shutdown()
+        _async_keep_for_reload(
+            hass,
+            serial_number,
+            apex_data[DATA_KEY_CONNECTION],
+            apex_data[DATA_KEY_INVENTORY],
+        )
     return unload_ok
 
 
-class ApexBaseEntity(CoordinatorEntity):
+@callback
+def _async_keep_for_reload(
+    hass: HomeAssistant,
+    serial_number: str,
+    conn: ManagedApexConnection,
+    inventory: ApexInventory,
+) -> None:
+    """Keep an unloaded entry's connection and inventory for RELOAD_GRACE, then release them."""
+
+    @callback
+    def _async_expire(_now) -> None:
+        """Release the connection, since the entry wasn't set up again in time."""
+        del hass.data[DATA_RELOADS][serial_number]
+        hass.async_create_task(async_get_connection_manager(hass).async_release(conn))
+
+    hass.data.setdefault(DATA_RELOADS, {})[serial_number] = (
+        conn,
+        inventory,
+        async_call_later(hass, RELOAD_GRACE, _async_expire),
+    )
+
+
+@callback
+def _async_reclaim(
+    hass: HomeAssistant, serial_number: str
+) -> tuple[ManagedApexConnection, ApexInventory] | None:
+    """Take back the connection and inventory kept when an entry was unloaded, if any."""
+    if (kept := hass.data.get(DATA_RELOADS, {}).pop(serial_number, None)) is None:
+        return None
+    conn, inventory, cancel_expiry = kept
+    cancel_expiry()
+    return conn, inventory
+
+
+async def async_remove_entry(hass: HomeAssistant, config: ConfigEntry) -> None:
+    """Forget the status and log import cursor saved for a removed Apex entry."""
+    serial_number = config.data[CONFIG_KEY_SERIAL_NUMBER]
+    if (kept := _async_reclaim(hass, serial_number)) is not None:
+        await async_get_connection_manager(hass).async_release(kept[0])
+    await ApexStatusCache(hass, serial_number).async_remove()
+    await async_remove_log_cursor(hass, serial_number)
+
+
+async def async_update_options(hass: HomeAssistant, config: ConfigEntry) -> None:
+    """Apply changed options to a running Apex entry."""
+    apex_data = hass.data[DOMAIN][config.data[CONFIG_KEY_SERIAL_NUMBER]]
+    coordinator = apex_data[DATA_KEY_COORDINATOR]
+    # Threshold sensors come and go with the probes which have thresholds
+    if (
+        config.options.get(CONFIG_KEY_THRESHOLDS, {}).keys()
+        != coordinator.thresholds.keys()
+    ):
+        await hass.config_entries.async_reload(config.entry_id)
+        return
+    _apply_options(config, coordinator)
+    _async_apply_capture(hass, config, coordinator.conn)
+    await _async_apply_exclusions(config, apex_data)
+
+
+async def _async_apply_exclusions(config: ConfigEntry, apex_data: dict) -> None:
+    """Stop or start reading the probes and outlets whose exclusion changed.
+
+    The status is downloaded again right away, and the inventory follows it like it
+    follows probes and outlets coming and going: the entities of newly excluded ones
+    are retired, and newly included ones get entities.
+    """
+    excluded = _get_excluded(config)
+    conn = apex_data[DATA_KEY_CONNECTION]
+    if excluded == conn.readings.excluded:
+        return
+    conn.readings.excluded = excluded
+    apex_data[DATA_KEY_INVENTORY].excluded = excluded
+    conn.expire()
+    await apex_data[DATA_KEY_COORDINATOR].async_refresh()
+
+
+def _apply_options(config: ConfigEntry, coordinator: ApexDataUpdateCoordinator) -> None:
+    """Apply an entry's options to its coordinator and connection."""
+    coordinator.scheduler.set_bounds(*_get_update_interval_bounds(config))
+    coordinator.optimistic_timeout = _get_optimistic_timeout(config)
+    coordinator.conn.freshness = timedelta(
+        seconds=config.options.get(
+            CONFIG_KEY_STATUS_FRESHNESS, DEFAULT_STATUS_FRESHNESS
+        )
+    )
+    coordinator.conn.request_timeout = timedelta(
+        seconds=config.options.get(CONFIG_KEY_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT)
+    )
+    coordinator.set_history_period(
+        timedelta(
+            minutes=config.options.get(
+                CONFIG_KEY_HISTORY_INTERVAL, DEFAULT_HISTORY_INTERVAL
+            )
+        )
+    )
+    coordinator.async_set_line_voltage(
+        config.options.get(CONFIG_KEY_LINE_VOLTAGE, DEFAULT_LINE_VOLTAGE)
+    )
+    coordinator.async_set_thresholds(config.options.get(CONFIG_KEY_THRESHOLDS, {}))
+    coordinator.slow_interval = timedelta(
+        seconds=config.options.get(CONFIG_KEY_SLOW_INTERVAL, DEFAULT_SLOW_INTERVAL)
+    )
+    coordinator.conn.readings.slow = frozenset(config.options.get(CONFIG_KEY_SLOW, []))
+
+
+@callback
+def _async_apply_capture(
+    hass: HomeAssistant, config: ConfigEntry, conn: ManagedApexConnection
+) -> None:
+    """Start or stop recording an Apex's status downloads and outlet commands."""
+    capture = config.options.get(CONFIG_KEY_CAPTURE, DEFAULT_CAPTURE)
+    if capture and conn.capture is None:
+        conn.capture = ApexCaptureWriter(
+            hass, config.data[CONF_HOST], config.data[CONFIG_KEY_SERIAL_NUMBER]
+        )
+        _LOGGER.info(
+            "Recording traffic of Apex at %s to %s", conn.hostname, conn.capture.path
+        )
+    elif not capture and conn.capture is not None:
+        hass.async_create_task(conn.capture.async_close())
+        conn.capture = None
+
+
+def _get_excluded(config: ConfigEntry) -> frozenset[str]:
+    """Get the probe keys and outlet device IDs an entry leaves out."""
+    return frozenset(config.options.get(CONFIG_KEY_EXCLUDED, []))
+
+
+def _get_platforms(config: ConfigEntry) -> list[Platform]:
+    """Get the entity platforms to set up for an entry."""
+    # Enable the state selection entities to allow controlling outlets
+    # if the configuration includes a username and password for authentication
+    if config.data[CONF_USERNAME] and config.data[CONF_PASSWORD]:
+        return [*PLATFORMS, Platform.SELECT]
+    return PLATFORMS
+
+
+def _get_update_interval_bounds(config: ConfigEntry) -> tuple[timedelta, timedelta]:
+    """Get the shortest and longest poll intervals configured for an entry."""
+    return (
+        timedelta(
+            seconds=config.options.get(
+                CONFIG_KEY_MIN_UPDATE_INTERVAL, DEFAULT_MIN_UPDATE_INTERVAL
+            )
+        ),
+        timedelta(
+            seconds=config.options.get(
+                CONFIG_KEY_MAX_UPDATE_INTERVAL, DEFAULT_MAX_UPDATE_INTERVAL
+            )
+        ),
+    )
+
+
+def _get_optimistic_timeout(config: ConfigEntry) -> timedelta | None:
+    """Get how long requested outlet states are shown unconfirmed, if at all."""
+    if not config.options.get(
+        CONFIG_KEY_OPTIMISTIC_OUTLETS, DEFAULT_OPTIMISTIC_OUTLETS
+    ):
+        return None
+    return timedelta(
+        seconds=config.options.get(
+            CONFIG_KEY_OPTIMISTIC_TIMEOUT, DEFAULT_OPTIMISTIC_TIMEOUT
+        )
+    )
+
+
+class ApexBaseEntity(CoordinatorEntity[ApexDataUpdateCoordinator]):
     """Base entity for Apex sensors managed by a DataUpdateCoordinator."""
 
+    # Key of the probe or outlet value this entity displays; None for entities
+    # which should be written on every coordinator update
+    _status_key: str | None = None
+
     def __init__(
         self,
         conn: ApexConnection,
-        coordinator: DataUpdateCoordinator,
+        coordinator: ApexDataUpdateCoordinator,
         name: str,
         serial_number: str,
     ) -> None:
@@ -104,13 +429,67 @@ class ApexBaseEntity(CoordinatorEntity):
         self.conn = conn
         self._name = name
         self._unique_id = serial_number
+        self._written_available = coordinator.last_update_success
+        # Every entity of an Apex shares the device information built for its coordinator
+        self._attr_device_info = coordinator.device_info
 
     @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device information of the entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._unique_id)},
-            name=self._name,
-            model="Apex Classic",
-            manufacturer="Neptune",
+    def _inventory_key(self) -> str | None:
+        """Return the key of the probe or outlet this entity belongs to."""
+        return self._status_key
+
+    @property
+    def _reported(self) -> bool:
+        """Return whether the coordinator's data still has this entity's probe or outlet."""
+        key = self._inventory_key
+        return (
+            key is None
+            or key in self.coordinator.data.probes
+            or key in self.coordinator.data.outlets
         )
+
+    async def async_added_to_hass(self) -> None:
+        """Follow updates of this entity's key, and the Apex no longer reporting it."""
+        self.coordinator_context = self._status_key
+        await super().async_added_to_hass()
+        if self._inventory_key is not None:
+            self.async_on_remove(
+                async_dispatcher_connect(
+                    self.hass,
+                    SIGNAL_INVENTORY_REMOVED.format(
+                        serial_number=self._unique_id, key=self._inventory_key
+                    ),
+                    self._async_retire,
+                )
+            )
+
+    async def _async_retire(self) -> None:
+        """Remove this entity, since its probe or outlet is gone from the Apex."""
+        _LOGGER.info("Removing %s, which the Apex no longer reports", self.entity_id)
+        if self.registry_entry is not None:
+            er.async_get(self.hass).async_remove(self.entity_id)
+        else:
+            await self.async_remove(force_remove=True)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only if this entity's value or availability changed."""
+        if not self._reported:
+            # Gone from the Apex; retired once the inventory catches up with the poll
+            return
+        available = self.coordinator.last_update_success
+        if (
+            self._status_key is not None
+            and available == self._written_available
+            and self._status_key not in self.coordinator.changed
+        ):
+            self.coordinator.skipped_writes += 1
+            return
+        self._written_available = available
+        self.coordinator.entity_writes += 1
+        self._async_update_attrs()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Convert the coordinator's data for this entity into its state, once per update."""
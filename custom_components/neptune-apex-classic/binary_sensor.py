@@ -1,11 +1,12 @@
-"""Create the binary sensor (outlet) entities associated with an Apex."""
+"""Create the binary sensor (outlet and probe threshold) entities associated with an Apex."""
 
 from __future__ import annotations
 
 import logging
 
 from neptune_apex_classic.connection import ApexConnection
-from neptune_apex_classic.outlet import Outlet, get_connected_outlets
+from neptune_apex_classic.outlet import Outlet
+from neptune_apex_classic.probe import Probe
 
 from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
@@ -14,18 +15,29 @@ from homeassistant.components.binary_sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_NAME
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import DiscoveryInfoType
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
 from . import ApexBaseEntity
 from .const import (
+    ATTR_LEVEL,
+    ATTR_PENDING_STATE,
     CONFIG_KEY_SERIAL_NUMBER,
     DATA_KEY_CONNECTION,
     DATA_KEY_COORDINATOR,
+    DATA_KEY_INVENTORY,
     DOMAIN,
+    SIGNAL_INVENTORY_ADDED,
+    THRESHOLD_HIGH,
+    THRESHOLD_LOW,
+    THRESHOLD_NORMAL,
 )
+from .coordinator import ApexDataUpdateCoordinator
+from .inventory import ApexInventoryChange
+from .parser import probe_key
+from .thresholds import threshold_key
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -44,17 +56,62 @@ async def async_setup_entry(
     apex_data = hass.data[DOMAIN][serial_number]
     conn = apex_data[DATA_KEY_CONNECTION]
     coordinator = apex_data[DATA_KEY_COORDINATOR]
+    inventory = apex_data[DATA_KEY_INVENTORY]
 
-    entities = []
-    for outlet in get_connected_outlets(conn):
-        entities.append(ApexOutlet(conn, coordinator, name, serial_number, outlet))
+    entities: list[ApexBaseEntity] = [
+        ApexOutlet(conn, coordinator, name, serial_number, outlet)
+        for outlet in inventory.outlets
+    ]
 
     _LOGGER.debug("Found %s outlets for Apex at %s", len(entities), hostname)
     if len(entities) == 0:
         _LOGGER.warning("Apex at %s did not return any outlets in its status", hostname)
 
+    entities.extend(
+        _create_threshold_sensors(
+            conn, coordinator, name, serial_number, inventory.probes
+        )
+    )
     async_add_entities(entities)
 
+    @callback
+    def _async_add_outlets(change: ApexInventoryChange) -> None:
+        """Create binary sensor entities for outlets the Apex started reporting."""
+        if change.outlets:
+            async_add_entities(
+                ApexOutlet(conn, coordinator, name, serial_number, outlet)
+                for outlet in change.outlets
+            )
+        if change.probes:
+            async_add_entities(
+                _create_threshold_sensors(
+                    conn, coordinator, name, serial_number, change.probes
+                )
+            )
+
+    config.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_INVENTORY_ADDED.format(serial_number=serial_number),
+            _async_add_outlets,
+        )
+    )
+
+
+def _create_threshold_sensors(
+    conn: ApexConnection,
+    coordinator: ApexDataUpdateCoordinator,
+    name: str,
+    serial_number: str,
+    probes: list[Probe],
+) -> list[ApexBaseEntity]:
+    """Create a threshold sensor for each probe with a threshold."""
+    return [
+        ApexProbeThreshold(conn, coordinator, name, serial_number, probe)
+        for probe in probes
+        if probe_key(probe.name, probe.type) in coordinator.thresholds
+    ]
+
 
 class ApexOutlet(ApexBaseEntity, BinarySensorEntity):
     """Apex outlet."""
@@ -62,7 +119,7 @@ class ApexOutlet(ApexBaseEntity, BinarySensorEntity):
     def __init__(
         self,
         conn: ApexConnection,
-        coordinator: DataUpdateCoordinator,
+        coordinator: ApexDataUpdateCoordinator,
         name: str,
         serial_number: str,
         outlet: Outlet,
@@ -70,24 +127,72 @@ class ApexOutlet(ApexBaseEntity, BinarySensorEntity):
         """Initialize the entity."""
         super().__init__(conn, coordinator, name, serial_number)
         self._outlet = outlet
+        self._status_key = outlet.device_id
         self.entity_description = BinarySensorEntityDescription(
             key=f"{outlet.name}-{outlet.device_id}",
             name=outlet.name,
             device_class=BinarySensorDeviceClass.POWER,
         )
+        self._attr_unique_id = f"{self._unique_id}/{self.entity_description.key}"
+        self._attr_name = f"{self._name} {outlet.name}"
+        self._async_update_attrs()
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Work out whether the outlet is on once per update."""
+        requested = self.coordinator.requested_outlet_state(self._status_key)
+        self._attr_extra_state_attributes = (
+            None if requested is None else {ATTR_PENDING_STATE: requested}
+        )
+        # A requested AUTO state leaves the outlet on or off as the Apex decides
+        if requested in [Outlet.ON, Outlet.OFF]:
+            self._attr_is_on = requested == Outlet.ON
+        else:
+            value = self.coordinator.data.outlets[self._status_key]
+            self._attr_is_on = value in [Outlet.AUTO_ON, Outlet.ON]
 
-    @property
-    def unique_id(self) -> str:
-        """Return this entity's unique ID."""
-        return f"{self._unique_id}/{self.entity_description.key}"
 
-    @property
-    def name(self) -> str:
-        """Return this entity's name."""
-        return f"{self._name} {self._outlet.name}"
+class ApexProbeThreshold(ApexBaseEntity, BinarySensorEntity):
+    """Whether a probe's reading is outside the limits of its threshold."""
+
+    def __init__(
+        self,
+        conn: ApexConnection,
+        coordinator: ApexDataUpdateCoordinator,
+        name: str,
+        serial_number: str,
+        probe: Probe,
+    ) -> None:
+        """Initialize the entity."""
+        super().__init__(conn, coordinator, name, serial_number)
+        self._probe = probe
+        self._probe_key = probe_key(probe.name, probe.type)
+        self._status_key = threshold_key(self._probe_key)
+        self.entity_description = BinarySensorEntityDescription(
+            key=f"{probe.name}-{probe.type}-threshold",
+            name=f"{probe.name} threshold",
+            device_class=BinarySensorDeviceClass.PROBLEM,
+        )
+        self._attr_unique_id = f"{self._unique_id}/{self.entity_description.key}"
+        self._attr_name = f"{self._name} {self.entity_description.name}"
+        self._async_update_attrs()
 
     @property
-    def is_on(self) -> bool:
-        """Get a value indicating whether this binary sensor is on or off."""
-        value = self._outlet.value
-        return value in [Outlet.AUTO_ON, Outlet.ON]
+    def _inventory_key(self) -> str | None:
+        """Return the key of the probe this entity watches."""
+        return self._probe_key
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Show whether the reading is at a low or high level."""
+        threshold = self.coordinator.thresholds.get(self._probe_key)
+        if threshold is None or threshold.level is None:
+            self._attr_is_on = None
+            self._attr_extra_state_attributes = None
+            return
+        self._attr_is_on = threshold.level != THRESHOLD_NORMAL
+        self._attr_extra_state_attributes = {
+            ATTR_LEVEL: threshold.level,
+            THRESHOLD_LOW: threshold.low,
+            THRESHOLD_HIGH: threshold.high,
+        }
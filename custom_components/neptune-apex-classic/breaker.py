@@ -0,0 +1,93 @@
+"""Circuit breaker which stops requests to an Apex that has stopped answering."""
+from __future__ import annotations
+
+import random
+from time import monotonic
+from typing import Any
+
+from homeassistant.backports.enum import StrEnum
+
+from .const import (
+    BREAKER_BACKOFF_FACTOR,
+    BREAKER_BASE_BACKOFF,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_JITTER,
+    BREAKER_MAX_BACKOFF,
+)
+
+
+class BreakerState(StrEnum):
+    """States of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Track whether an Apex is answering and hold requests back while it isn't.
+
+    The breaker opens after BREAKER_FAILURE_THRESHOLD requests fail in a row, and
+    then refuses requests until its backoff passes. The backoff doubles each time the
+    breaker opens again without a request succeeding in between, up to
+    BREAKER_MAX_BACKOFF, and is randomly shortened by up to BREAKER_JITTER of itself
+    so that controllers which failed together don't retry together. Once the backoff
+    passes the breaker is half open and lets one request through to probe the Apex:
+    success closes the breaker, and failure opens it again.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a closed breaker."""
+        self.state = BreakerState.CLOSED
+        # Requests which failed in a row, and times the breaker opened in a row
+        self.failures = 0
+        self.opened = 0
+        # When the breaker goes half open, in monotonic seconds
+        self._retry_at = 0.0
+
+    def allow_request(self) -> bool:
+        """Return whether a request may be sent now."""
+        if self.state == BreakerState.OPEN:
+            if monotonic() < self._retry_at:
+                return False
+            self.state = BreakerState.HALF_OPEN
+        return True
+
+    def record_success(self) -> None:
+        """Close the breaker after a request succeeded."""
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened = 0
+
+    def record_failure(self) -> None:
+        """Count a failed request, opening the breaker if there were too many."""
+        self.failures += 1
+        if (
+            self.state == BreakerState.HALF_OPEN
+            or self.failures >= BREAKER_FAILURE_THRESHOLD
+        ):
+            backoff = min(
+                BREAKER_MAX_BACKOFF.total_seconds(),
+                BREAKER_BASE_BACKOFF.total_seconds()
+                * BREAKER_BACKOFF_FACTOR**self.opened,
+            )
+            self.state = BreakerState.OPEN
+            self.opened += 1
+            self._retry_at = monotonic() + backoff * (
+                1 - random.uniform(0, BREAKER_JITTER)
+            )
+
+    def retry_in(self) -> float:
+        """Return the seconds until an open breaker lets a request through."""
+        if self.state != BreakerState.OPEN:
+            return 0.0
+        return max(0.0, self._retry_at - monotonic())
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the breaker's state for diagnostics."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened": self.opened,
+            "retry_in": round(self.retry_in(), 1),
+        }
@@ -0,0 +1,52 @@
+"""Storage of the last status document downloaded from each Apex."""
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+
+from .connection import ManagedApexConnection
+from .const import DOMAIN, STATUS_CACHE_SAVE_INTERVAL, STORAGE_VERSION
+
+
+class ApexStatusCache:
+    """Remember an Apex's last status document so its entities can be created without it.
+
+    The document holds the names, types, and device IDs of the probes and outlets
+    along with their last values. It is saved right away when probes or outlets come
+    or go, and otherwise at most once every STATUS_CACHE_SAVE_INTERVAL.
+    """
+
+    def __init__(self, hass: HomeAssistant, serial_number: str) -> None:
+        """Initialize the cache for an Apex."""
+        self._store = Store[dict[str, str]](
+            hass, STORAGE_VERSION, f"{DOMAIN}.{slugify(serial_number)}"
+        )
+        # When the download saved last was made
+        self._saved_download: float | None = None
+
+    async def async_load(self) -> str | None:
+        """Get the saved status document, if there is one."""
+        if (data := await self._store.async_load()) is None:
+            return None
+        return data.get("status")
+
+    @callback
+    def async_save(self, conn: ManagedApexConnection) -> None:
+        """Save the connection's latest status document if it is due to be saved."""
+        downloaded = conn.refreshed_at
+        if downloaded is None or downloaded == self._saved_download:
+            return
+        if (
+            not conn.readings.inventory_changed
+            and self._saved_download is not None
+            and downloaded - self._saved_download
+            < STATUS_CACHE_SAVE_INTERVAL.total_seconds()
+        ):
+            return
+        self._saved_download = downloaded
+        self._store.async_delay_save(lambda: {"status": conn.status_document()})
+
+    async def async_remove(self) -> None:
+        """Forget the saved status document."""
+        await self._store.async_remove()
@@ -0,0 +1,138 @@
+"""Capture files recording the status downloads and outlet commands sent to an Apex."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import gzip
+import json
+from pathlib import Path
+from time import monotonic, time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import CAPTURE_DIRECTORY, CAPTURE_FLUSH_INTERVAL, CAPTURE_VERSION
+
+# Kinds of requests recorded in a capture
+CAPTURE_STATUS = "status"
+CAPTURE_COMMAND = "command"
+
+
+@dataclass
+class CaptureRecord:
+    """One request sent to an Apex and how it went."""
+
+    # Seconds since the capture started, and seconds the request took
+    offset: float
+    duration: float
+    kind: str
+    ok: bool
+    # Status document downloaded, or None if the download failed
+    document: str | None = None
+    # Form data of an outlet command
+    payload: dict[str, str] | None = None
+
+
+class ApexCaptureWriter:
+    """Record an Apex's status downloads and outlet commands, with their timings.
+
+    Captures are gzipped JSON lines: a header naming the host and when the capture
+    started, then one line per request. Status documents are only written when they
+    differ from the previous one, which is what keeps a long capture small. Lines
+    are buffered and appended to the file in the executor at most once every
+    CAPTURE_FLUSH_INTERVAL.
+    """
+
+    def __init__(self, hass: HomeAssistant, hostname: str, serial_number: str) -> None:
+        """Start a capture in a new file."""
+        self._hass = hass
+        self.path = Path(
+            hass.config.path(
+                CAPTURE_DIRECTORY,
+                f"{slugify(serial_number)}-"
+                f"{dt_util.now().strftime('%Y%m%d-%H%M%S')}.jsonl.gz",
+            )
+        )
+        self._started = monotonic()
+        self._last_document: str | None = None
+        self._lines = [
+            json.dumps({"v": CAPTURE_VERSION, "host": hostname, "started": time()})
+        ]
+        self._flushed_at = self._started
+        # Writes run one at a time, in the order they were buffered
+        self._write_lock = asyncio.Lock()
+
+    @callback
+    def record_status(self, duration: float, document: str | None) -> None:
+        """Record a status download, and the document if it downloaded."""
+        line: dict[str, Any] = {
+            "t": round(monotonic() - self._started - duration, 3),
+            "d": round(duration, 3),
+            "k": CAPTURE_STATUS,
+            "ok": document is not None,
+        }
+        if document is not None and document != self._last_document:
+            line["b"] = document
+            self._last_document = document
+        self._add(line)
+
+    @callback
+    def record_command(
+        self, duration: float, payload: dict[str, str], ok: bool
+    ) -> None:
+        """Record an outlet command and whether the Apex accepted it."""
+        self._add(
+            {
+                "t": round(monotonic() - self._started - duration, 3),
+                "d": round(duration, 3),
+                "k": CAPTURE_COMMAND,
+                "ok": ok,
+                "p": payload,
+            }
+        )
+
+    async def async_close(self) -> None:
+        """Write out everything recorded so far."""
+        await self._async_flush()
+
+    @callback
+    def _add(self, line: dict[str, Any]) -> None:
+        """Buffer a line, writing the buffer out if it's been a while."""
+        self._lines.append(json.dumps(line, separators=(",", ":")))
+        if monotonic() - self._flushed_at >= CAPTURE_FLUSH_INTERVAL.total_seconds():
+            self._hass.async_create_task(self._async_flush())
+
+    async def _async_flush(self) -> None:
+        """Append the buffered lines to the capture file."""
+        lines, self._lines = self._lines, []
+        self._flushed_at = monotonic()
+        if lines:
+            async with self._write_lock:
+                await self._hass.async_add_executor_job(self._write, lines)
+
+    def _write(self, lines: list[str]) -> None:
+        """Append lines to the capture file as a new gzip member."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(self.path, "at", encoding="utf-8") as capture:
+            capture.write("\n".join(lines) + "\n")
+
+
+def read_capture(path: Path) -> tuple[dict[str, Any], list[CaptureRecord]]:
+    """Read a capture file's header and its records, filling in repeated documents."""
+    with gzip.open(path, "rt", encoding="utf-8") as capture:
+        header = json.loads(capture.readline())
+        if header.get("v") != CAPTURE_VERSION:
+            raise ValueError(f"Unsupported capture version {header.get('v')}")
+        records = []
+        document = None
+        for line in capture:
+            data = json.loads(line)
+            record = CaptureRecord(data["t"], data["d"], data["k"], data["ok"])
+            if record.kind == CAPTURE_STATUS:
+                document = data.get("b", document)
+                record.document = document if record.ok else None
+            else:
+                record.payload = data["p"]
+            records.append(record)
+    return header, records
@@ -0,0 +1,113 @@
+"""Queue of outlet commands sent to an Apex."""
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from neptune_apex_classic.outlet import Outlet
+
+from homeassistant.core import HomeAssistant
+
+from .const import TIME_BETWEEN_COMMANDS
+from .coordinator import ApexDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ApexCommandQueue:
+    """Send outlet commands to an Apex one at a time and refresh once afterwards.
+
+    Commands queued for an outlet which already has a command waiting replace it, so
+    only the last requested state is sent. Requested states are shown right away when
+    the coordinator is optimistic, and the next poll confirms them. Otherwise, once
+    the queue is empty the coordinator is asked for a single refresh covering every
+    command in the batch.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, coordinator: ApexDataUpdateCoordinator
+    ) -> None:
+        """Initialize the queue."""
+        self._hass = hass
+        self._coordinator = coordinator
+        # Waiting commands keyed by outlet device ID, with everyone waiting on them
+        self._pending: dict[str, tuple[Outlet, str, list[asyncio.Future[bool]]]] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    async def async_set_state(self, outlet: Outlet, state: str) -> bool:
+        """Queue a new state for an outlet and wait until the Apex was sent it."""
+        future: asyncio.Future[bool] = self._hass.loop.create_future()
+        self._coordinator.async_set_requested_outlet_state(outlet.device_id, state)
+        if (pending := self._pending.get(outlet.device_id)) is not None:
+            _LOGGER.debug(
+                "Replacing queued state %s with %s for %s",
+                pending[1],
+                state,
+                outlet.name,
+            )
+            pending[2].append(future)
+            self._pending[outlet.device_id] = (outlet, state, pending[2])
+        else:
+            self._pending[outlet.device_id] = (outlet, state, [future])
+
+        if self._task is None:
+            self._task = self._hass.async_create_task(self._async_send_pending())
+        return await future
+
+    async def async_shutdown(self) -> None:
+        """Stop sending commands, failing any that are still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for _, _, futures in self._pending.values():
+            _resolve(futures, False)
+        self._pending.clear()
+
+    async def _async_send_pending(self) -> None:
+        """Send queued commands until none are left, then refresh the coordinator."""
+        sent = 0
+        # Everyone waiting on the command being sent, failed if sending stops early
+        futures: list[asyncio.Future[bool]] = []
+        try:
+            while self._pending:
+                if sent:
+                    await asyncio.sleep(TIME_BETWEEN_COMMANDS.total_seconds())
+                device_id = next(iter(self._pending))
+                outlet, state, futures = self._pending.pop(device_id)
+                result = await outlet.set_state(state)
+                if not result:
+                    _LOGGER.warning(
+                        "Apex did not accept state %s for %s", state, outlet.name
+                    )
+                    self._coordinator.async_cancel_requested_outlet_state(device_id)
+                _resolve(futures, result)
+                futures = []
+                sent += 1
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception(
+                "Error sending outlet commands to %s", self._coordinator.name
+            )
+            # Nothing is left to send the rest of the queue, so fail it too
+            if futures:
+                self._coordinator.async_cancel_requested_outlet_state(device_id)
+            for queued_id, (_, _, queued) in self._pending.items():
+                self._coordinator.async_cancel_requested_outlet_state(queued_id)
+                _resolve(queued, False)
+            self._pending.clear()
+        finally:
+            # A queue shut down while sending may have started sending again since
+            if self._task is asyncio.current_task():
+                self._task = None
+            _resolve(futures, False)
+
+        _LOGGER.debug("Sent %s outlet commands to %s", sent, self._coordinator.name)
+        self._coordinator.async_poll_soon()
+        if self._coordinator.optimistic_timeout is None:
+            await self._coordinator.async_request_refresh()
+
+
+def _resolve(futures: list[asyncio.Future[bool]], result: bool) -> None:
+    """Tell everyone still waiting on a command whether the Apex accepted it."""
+    for future in futures:
+        if not future.done():
+            future.set_result(result)
@@ -1,23 +1,63 @@
 """Configuration UI definition."""
 
+from ipaddress import IPv4Network
 import logging
 from typing import Any
 
-from neptune_apex_classic.connection import ApexConnection
+from neptune_apex_classic.outlet import get_connected_outlets
+from neptune_apex_classic.probe import get_connected_probes
 import voluptuous as vol
 
 from homeassistant import config_entries
+from homeassistant.components import network
 from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
 
+from .connection import async_get_connection_manager
 from .const import (
+    CONFIG_KEY_CAPTURE,
+    CONFIG_KEY_CONTROLLERS,
+    CONFIG_KEY_EXCLUDED,
+    CONFIG_KEY_HISTORY_INTERVAL,
+    CONFIG_KEY_LINE_VOLTAGE,
+    CONFIG_KEY_MAX_UPDATE_INTERVAL,
+    CONFIG_KEY_MIN_UPDATE_INTERVAL,
+    CONFIG_KEY_NETWORK,
+    CONFIG_KEY_OPTIMISTIC_OUTLETS,
+    CONFIG_KEY_OPTIMISTIC_TIMEOUT,
+    CONFIG_KEY_REQUEST_TIMEOUT,
     CONFIG_KEY_SERIAL_NUMBER,
+    CONFIG_KEY_SLOW,
+    CONFIG_KEY_SLOW_INTERVAL,
+    CONFIG_KEY_STATUS_FRESHNESS,
+    CONFIG_KEY_THRESHOLDS,
+    DATA_KEY_CONNECTION,
+    DATA_KEY_INVENTORY,
+    DEFAULT_CAPTURE,
+    DEFAULT_HISTORY_INTERVAL,
+    DEFAULT_LINE_VOLTAGE,
+    DEFAULT_MAX_UPDATE_INTERVAL,
+    DEFAULT_MIN_UPDATE_INTERVAL,
     DEFAULT_NAME,
+    DEFAULT_NETWORK,
+    DEFAULT_OPTIMISTIC_OUTLETS,
+    DEFAULT_OPTIMISTIC_TIMEOUT,
     DEFAULT_PASSWORD,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_SLOW_INTERVAL,
+    DEFAULT_STATUS_FRESHNESS,
     DEFAULT_USERNAME,
+    DISCOVERY_MAX_ADDRESSES,
     DOMAIN,
+    THRESHOLD_HIGH,
+    THRESHOLD_HYSTERESIS,
+    THRESHOLD_LOW,
 )
+from .discovery import DiscoveredApex, async_get_scanner
+from .parser import probe_key
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,20 +67,39 @@ class ApexConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Create the options flow for an Apex."""
+        return ApexOptionsFlow(config_entry)
+
+    def __init__(self) -> None:
+        """Initialize the config flow."""
+        # Apexes found by the last scan which aren't set up yet, keyed by serial number
+        self._discovered: dict[str, DiscoveredApex] = {}
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Offer to scan a subnet for Apexes or to enter one by hand."""
+        return self.async_show_menu(step_id="user", menu_options=["discover", "manual"])
+
+    async def async_step_manual(
+        self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Present the user configuration."""
         errors = {}
         if user_input is not None:
-            session = async_get_clientsession(self.hass, False)
-            conn = ApexConnection(
-                user_input[CONF_HOST],
-                session,
-                user_input[CONF_USERNAME],
-                user_input[CONF_PASSWORD],
-            )
-            serial_number = await conn.get_serial_number()
+            # Reading the serial number needs no credentials, and passing none keeps
+            # those of an entry already using the connection
+            manager = async_get_connection_manager(self.hass)
+            conn = manager.async_acquire(user_input[CONF_HOST], None, None)
+            try:
+                serial_number = await conn.get_serial_number()
+            finally:
+                await manager.async_release(conn)
             if serial_number is None:
                 errors["base"] = "status-not-found"
             else:
@@ -73,5 +132,344 @@ class ApexConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         }
 
         return self.async_show_form(
-            step_id="user", data_schema=vol.Schema(data_schema), errors=errors
+            step_id="manual", data_schema=vol.Schema(data_schema), errors=errors
+        )
+
+    async def async_step_discover(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Scan a subnet for Apexes which aren't set up yet."""
+        errors = {}
+        if user_input is not None:
+            try:
+                network = IPv4Network(user_input[CONFIG_KEY_NETWORK], strict=False)
+            except ValueError:
+                errors["base"] = "invalid-network"
+            else:
+                if network.num_addresses > DISCOVERY_MAX_ADDRESSES:
+                    errors["base"] = "network-too-large"
+                else:
+                    configured = self._async_current_ids()
+                    self._discovered = {
+                        apex.serial_number: apex
+                        for apex in await async_get_scanner(self.hass).async_scan(
+                            network
+                        )
+                        if apex.serial_number not in configured
+                    }
+                    if self._discovered:
+                        return await self.async_step_pick()
+                    errors["base"] = "none-found"
+
+        user_input = user_input or {}
+        data_schema = {
+            vol.Required(
+                CONFIG_KEY_NETWORK,
+                default=user_input.get(CONFIG_KEY_NETWORK)
+                or await self._async_default_network(),
+            ): str,
+        }
+
+        return self.async_show_form(
+            step_id="discover", data_schema=vol.Schema(data_schema), errors=errors
+        )
+
+    async def async_step_pick(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Set up the Apexes picked from those a scan found."""
+        errors = {}
+        if user_input is not None:
+            if not (picked := user_input[CONFIG_KEY_CONTROLLERS]):
+                errors["base"] = "none-picked"
+            else:
+                entries = [
+                    {
+                        CONF_HOST: self._discovered[serial_number].host,
+                        CONF_NAME: self._discovered[serial_number].hostname,
+                        CONF_USERNAME: user_input.get(CONF_USERNAME),
+                        CONF_PASSWORD: user_input.get(CONF_PASSWORD),
+                        CONFIG_KEY_SERIAL_NUMBER: serial_number,
+                    }
+                    for serial_number in picked
+                ]
+                # A flow creates one entry, so the others get flows of their own
+                for data in entries[1:]:
+                    self.hass.async_create_task(
+                        self.hass.config_entries.flow.async_init(
+                            DOMAIN,
+                            context={"source": config_entries.SOURCE_IMPORT},
+                            data=data,
+                        )
+                    )
+                return await self.async_step_import(entries[0])
+
+        data_schema = {
+            vol.Required(
+                CONFIG_KEY_CONTROLLERS, default=list(self._discovered)
+            ): cv.multi_select(
+                {
+                    serial_number: f"{apex.hostname} at {apex.host} ({serial_number})"
+                    for serial_number, apex in self._discovered.items()
+                }
+            ),
+            vol.Optional(CONF_USERNAME, default=DEFAULT_USERNAME): str,
+            vol.Optional(CONF_PASSWORD, default=DEFAULT_PASSWORD): str,
+        }
+
+        return self.async_show_form(
+            step_id="pick", data_schema=vol.Schema(data_schema), errors=errors
         )
+
+    async def async_step_import(self, import_data: dict[str, Any]) -> FlowResult:
+        """Create the entry of an Apex found by a scan."""
+        serial_number = import_data[CONFIG_KEY_SERIAL_NUMBER]
+        _LOGGER.info("Setting up Apex with serial number %s", serial_number)
+        await self.async_set_unique_id(serial_number)
+        self._abort_if_unique_id_configured()
+        return self.async_create_entry(title=import_data[CONF_NAME], data=import_data)
+
+    async def _async_default_network(self) -> str:
+        """Guess the subnet to scan from Home Assistant's own address."""
+        if "network" in self.hass.config.components:
+            try:
+                source_ip = await network.async_get_source_ip(self.hass)
+            except HomeAssistantError:
+                pass
+            else:
+                return str(IPv4Network(f"{source_ip}/24", strict=False))
+        return DEFAULT_NETWORK
+
+
+class ApexOptionsFlow(config_entries.OptionsFlow):
+    """Define the options flow for an Apex."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self.config_entry = config_entry
+        # Options chosen so far, and the probe whose threshold is being edited
+        self._options: dict[str, Any] = {}
+        self._probe: str | None = None
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Present the polling, outlet control, probe history, and energy options."""
+        errors = {}
+        if user_input is not None:
+            if (
+                user_input[CONFIG_KEY_MIN_UPDATE_INTERVAL]
+                > user_input[CONFIG_KEY_MAX_UPDATE_INTERVAL]
+            ):
+                errors["base"] = "invalid-update-interval"
+            elif (
+                user_input[CONFIG_KEY_STATUS_FRESHNESS]
+                >= user_input[CONFIG_KEY_MIN_UPDATE_INTERVAL]
+            ):
+                # Polls would otherwise be answered with the previous poll's status
+                errors["base"] = "invalid-status-freshness"
+            else:
+                options = self.config_entry.options
+                self._options = {
+                    **user_input,
+                    CONFIG_KEY_EXCLUDED: options.get(CONFIG_KEY_EXCLUDED, []),
+                    CONFIG_KEY_SLOW: options.get(CONFIG_KEY_SLOW, []),
+                    CONFIG_KEY_SLOW_INTERVAL: options.get(
+                        CONFIG_KEY_SLOW_INTERVAL, DEFAULT_SLOW_INTERVAL
+                    ),
+                    CONFIG_KEY_THRESHOLDS: dict(options.get(CONFIG_KEY_THRESHOLDS, {})),
+                }
+                return await self.async_step_tracking()
+
+        options = user_input or self.config_entry.options
+        data_schema = {
+            vol.Required(
+                CONFIG_KEY_MIN_UPDATE_INTERVAL,
+                default=options.get(
+                    CONFIG_KEY_MIN_UPDATE_INTERVAL, DEFAULT_MIN_UPDATE_INTERVAL
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Required(
+                CONFIG_KEY_MAX_UPDATE_INTERVAL,
+                default=options.get(
+                    CONFIG_KEY_MAX_UPDATE_INTERVAL, DEFAULT_MAX_UPDATE_INTERVAL
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Required(
+                CONFIG_KEY_OPTIMISTIC_OUTLETS,
+                default=options.get(
+                    CONFIG_KEY_OPTIMISTIC_OUTLETS, DEFAULT_OPTIMISTIC_OUTLETS
+                ),
+            ): bool,
+            vol.Required(
+                CONFIG_KEY_OPTIMISTIC_TIMEOUT,
+                default=options.get(
+                    CONFIG_KEY_OPTIMISTIC_TIMEOUT, DEFAULT_OPTIMISTIC_TIMEOUT
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Required(
+                CONFIG_KEY_STATUS_FRESHNESS,
+                default=options.get(
+                    CONFIG_KEY_STATUS_FRESHNESS, DEFAULT_STATUS_FRESHNESS
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Required(
+                CONFIG_KEY_REQUEST_TIMEOUT,
+                default=options.get(
+                    CONFIG_KEY_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Required(
+                CONFIG_KEY_HISTORY_INTERVAL,
+                default=options.get(
+                    CONFIG_KEY_HISTORY_INTERVAL, DEFAULT_HISTORY_INTERVAL
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Required(
+                CONFIG_KEY_LINE_VOLTAGE,
+                default=options.get(CONFIG_KEY_LINE_VOLTAGE, DEFAULT_LINE_VOLTAGE),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Required(
+                CONFIG_KEY_CAPTURE,
+                default=options.get(CONFIG_KEY_CAPTURE, DEFAULT_CAPTURE),
+            ): bool,
+        }
+
+        return self.async_show_form(
+            step_id="init", data_schema=vol.Schema(data_schema), errors=errors
+        )
+
+    async def async_step_tracking(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Pick the probes and outlets to leave out, and those to read less often."""
+        errors = {}
+        if (choices := self._inventory_choices()) is None:
+            return await self.async_step_thresholds()
+        if user_input is not None:
+            if set(user_input[CONFIG_KEY_EXCLUDED]) & set(user_input[CONFIG_KEY_SLOW]):
+                errors["base"] = "invalid-tracking"
+            else:
+                self._options.update(user_input)
+                return await self.async_step_thresholds()
+
+        options = user_input or self._options
+        data_schema = {
+            vol.Required(
+                CONFIG_KEY_EXCLUDED,
+                default=[key for key in options[CONFIG_KEY_EXCLUDED] if key in choices],
+            ): cv.multi_select(choices),
+            vol.Required(
+                CONFIG_KEY_SLOW,
+                default=[key for key in options[CONFIG_KEY_SLOW] if key in choices],
+            ): cv.multi_select(choices),
+            vol.Required(
+                CONFIG_KEY_SLOW_INTERVAL, default=options[CONFIG_KEY_SLOW_INTERVAL]
+            ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        }
+
+        return self.async_show_form(
+            step_id="tracking", data_schema=vol.Schema(data_schema), errors=errors
+        )
+
+    async def async_step_thresholds(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Pick a probe to set the threshold of, or finish."""
+        probes = self._probe_choices()
+        if user_input is not None or not probes:
+            if (probe := (user_input or {}).get("probe")) is not None:
+                self._probe = probe
+                return await self.async_step_threshold()
+            return self.async_create_entry(title="", data=self._options)
+
+        return self.async_show_form(
+            step_id="thresholds",
+            data_schema=vol.Schema({vol.Optional("probe"): vol.In(probes)}),
+        )
+
+    async def async_step_threshold(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Set the limits and hysteresis of one probe's threshold."""
+        errors = {}
+        thresholds = self._options[CONFIG_KEY_THRESHOLDS]
+        if user_input is not None:
+            low = user_input.get(THRESHOLD_LOW)
+            high = user_input.get(THRESHOLD_HIGH)
+            if low is not None and high is not None and low >= high:
+                errors["base"] = "invalid-threshold"
+            else:
+                # Leaving out both limits removes the threshold
+                if low is None and high is None:
+                    thresholds.pop(self._probe, None)
+                else:
+                    thresholds[self._probe] = {
+                        THRESHOLD_LOW: low,
+                        THRESHOLD_HIGH: high,
+                        THRESHOLD_HYSTERESIS: user_input[THRESHOLD_HYSTERESIS],
+                    }
+                return await self.async_step_thresholds()
+
+        current = user_input or thresholds.get(self._probe, {})
+        data_schema = {
+            vol.Optional(
+                THRESHOLD_LOW,
+                description={"suggested_value": current.get(THRESHOLD_LOW)},
+            ): vol.Coerce(float),
+            vol.Optional(
+                THRESHOLD_HIGH,
+                description={"suggested_value": current.get(THRESHOLD_HIGH)},
+            ): vol.Coerce(float),
+            vol.Required(
+                THRESHOLD_HYSTERESIS,
+                default=current.get(THRESHOLD_HYSTERESIS, 0.0),
+            ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        }
+
+        return self.async_show_form(
+            step_id="threshold",
+            data_schema=vol.Schema(data_schema),
+            errors=errors,
+            description_placeholders={"probe": self._probe},
+        )
+
+    def _probe_choices(self) -> dict[str, str]:
+        """Label the probes of the running Apex with their thresholds, if any."""
+        apex_data = self.hass.data.get(DOMAIN, {}).get(
+            self.config_entry.data[CONFIG_KEY_SERIAL_NUMBER]
+        )
+        if apex_data is None:
+            return {}
+        thresholds = self._options[CONFIG_KEY_THRESHOLDS]
+        choices = {}
+        for probe in apex_data[DATA_KEY_INVENTORY].probes:
+            key = probe_key(probe.name, probe.type)
+            if key in self._options[CONFIG_KEY_EXCLUDED]:
+                continue
+            label = f"{probe.name} ({probe.type})"
+            if (threshold := thresholds.get(key)) is not None:
+                limits = ", ".join(
+                    f"{limit} {threshold[limit]}"
+                    for limit in (THRESHOLD_LOW, THRESHOLD_HIGH)
+                    if threshold[limit] is not None
+                )
+                label = f"{label}: {limits}"
+            choices[key] = label
+        return choices
+
+    def _inventory_choices(self) -> dict[str, str] | None:
+        """Label every probe and outlet the running Apex reports, excluded or not."""
+        apex_data = self.hass.data.get(DOMAIN, {}).get(
+            self.config_entry.data[CONFIG_KEY_SERIAL_NUMBER]
+        )
+        if apex_data is None:
+            return None
+        conn = apex_data[DATA_KEY_CONNECTION]
+        choices = {
+            probe_key(probe.name, probe.type): f"{probe.name} ({probe.type})"
+            for probe in get_connected_probes(conn)
+        }
+        for outlet in get_connected_outlets(conn):
+            choices[outlet.device_id] = f"{outlet.name} (outlet {outlet.device_id})"
+        return choices
@@ -0,0 +1,328 @@
+"""Connections to Apex controllers shared by everything talking to the same host."""
+from __future__ import annotations
+
+import asyncio
+from datetime import date, timedelta
+import logging
+from time import monotonic
+from xml.etree.ElementTree import Element, ParseError, fromstring
+
+import aiohttp
+import async_timeout
+from bs4 import BeautifulSoup
+from neptune_apex_classic.connection import ApexConnection
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+
+from .const import (
+    CONNECTION_KEEPALIVE_TIMEOUT,
+    DATA_CONNECTION_MANAGER,
+    DEFAULT_MAX_REQUESTS_IN_FLIGHT,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_STATUS_FRESHNESS,
+    STATUS_CHUNK_SIZE,
+)
+from .breaker import BreakerState, CircuitBreaker
+from .capture import ApexCaptureWriter
+from .metrics import RollingStatistic
+from .parser import ApexReadings, StatusParser
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ManagedApexConnection(ApexConnection):
+    """An ApexConnection which limits how many requests it has in flight at once.
+
+    The Apex Classic's web server drops requests it receives concurrently, so
+    status downloads and outlet commands wait their turn here instead. Refreshes
+    requested while one is already downloading share its result, and refreshes
+    requested within `freshness` of the last successful download reuse it.
+
+    Requests are abandoned after `request_timeout`, and a circuit breaker stops
+    refreshes and commands while the Apex isn't answering.
+
+    Status documents are parsed incrementally into `readings` while they download,
+    and the time spent downloading and parsing each one is measured. While `capture`
+    is set, status downloads and outlet commands are recorded to it.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        client_session: aiohttp.ClientSession,
+        username: str | None,
+        password: str | None,
+        max_in_flight: int,
+    ) -> None:
+        """Initialize the connection."""
+        super().__init__(hostname, client_session, username, password)
+        self.hostname = hostname
+        self.freshness = timedelta(seconds=DEFAULT_STATUS_FRESHNESS)
+        self.shared_refreshes = 0
+        self.request_timeout = timedelta(seconds=DEFAULT_REQUEST_TIMEOUT)
+        self.breaker = CircuitBreaker()
+        self.readings = ApexReadings()
+        self.capture: ApexCaptureWriter | None = None
+        # Milliseconds spent downloading and parsing status documents
+        self.fetch_time = RollingStatistic()
+        self.parse_time = RollingStatistic()
+        self._requests = asyncio.Semaphore(max_in_flight)
+        self._refresh_task: asyncio.Task[bool] | None = None
+        # When the last successful download finished, and the pieces it arrived in
+        self.refreshed_at: float | None = None
+        self._status_chunks: list[bytes] = []
+
+    def set_credentials(self, username: str | None, password: str | None) -> None:
+        """Change the credentials used to control outlets."""
+        self._username = username
+        self._password = password
+
+    def expire(self) -> None:
+        """Make the next refresh download the status, however fresh the last download is."""
+        self.refreshed_at = None
+
+    def load_status(self, document: str) -> None:
+        """Read probes, outlets, and their values from a previously downloaded document."""
+        parser = StatusParser(self.readings)
+        parser.feed(document)
+        parser.close()
+        self._status_soup = BeautifulSoup(document, "xml")
+
+    def status_document(self) -> str | None:
+        """Get the document the last successful download received."""
+        if not self._status_chunks:
+            return None
+        return b"".join(self._status_chunks).decode(errors="replace")
+
+    async def refresh(self) -> bool:
+        """Refresh probe and outlet readings unless a fresh enough download exists.
+
+        Return whether the readings are from a successful download.
+        """
+        if self._refresh_task is None:
+            if (
+                self.refreshed_at is not None
+                and monotonic() - self.refreshed_at < self.freshness.total_seconds()
+            ):
+                self.shared_refreshes += 1
+                return True
+            if not self.breaker.allow_request():
+                return False
+            self._refresh_task = asyncio.create_task(self._async_refresh())
+            self._refresh_task.add_done_callback(self._refresh_done)
+        else:
+            self.shared_refreshes += 1
+
+        # Shielded so that a cancelled caller doesn't cancel the download for the others
+        return await asyncio.shield(self._refresh_task)
+
+    async def _async_refresh(self) -> bool:
+        """Download the status and remember when it was downloaded successfully."""
+        start = monotonic()
+        downloaded = await self._async_stream_status()
+        if self.capture is not None:
+            self.capture.record_status(
+                monotonic() - start, self.status_document() if downloaded else None
+            )
+        if not downloaded:
+            self.breaker.record_failure()
+            return False
+        self.breaker.record_success()
+        self.refreshed_at = monotonic()
+        return True
+
+    def _refresh_done(self, _task: asyncio.Task[bool]) -> None:
+        """Let the next refresh start a new download."""
+        self._refresh_task = None
+
+    async def _async_stream_status(self) -> bool:
+        """Parse the status document into `readings` as it downloads.
+
+        The library's probes and outlets are built from soup, so the document is only
+        parsed into soup as well when probes or outlets came or went.
+        """
+        parser = StatusParser(self.readings)
+        chunks: list[bytes] = []
+        parse_time = 0.0
+        async with self._requests:
+            start = monotonic()
+            try:
+                async with async_timeout.timeout(
+                    self.request_timeout.total_seconds()
+                ), self._session.get(f"{self._hostname}/cgi-bin/status.xml") as resp:
+                    if resp.status != 200:
+                        return False
+                    async for chunk in resp.content.iter_chunked(STATUS_CHUNK_SIZE):
+                        chunks.append(chunk)
+                        parse_start = monotonic()
+                        parser.feed(chunk)
+                        parse_time += monotonic() - parse_start
+                downloaded = monotonic()
+                parser.close()
+            except (
+                asyncio.TimeoutError,
+                aiohttp.ClientConnectionError,
+                aiohttp.ClientResponseError,
+            ):
+                return False
+            except ParseError as err:
+                _LOGGER.warning(
+                    "Apex at %s sent an invalid status: %s", self.hostname, err
+                )
+                return False
+
+        self._status_chunks = chunks
+        if self.readings.inventory_changed or self._status_soup is None:
+            self._status_soup = BeautifulSoup(b"".join(chunks), "xml")
+        self.fetch_time.record((downloaded - start - parse_time) * 1000)
+        self.parse_time.record((parse_time + monotonic() - downloaded) * 1000)
+        return True
+
+    async def async_get_log(self, name: str, day: date) -> Element | None:
+        """Download one day of a log the Apex keeps, such as its datalog or outlet log."""
+        if self.breaker.state == BreakerState.OPEN:
+            return None
+        async with self._requests:
+            try:
+                async with async_timeout.timeout(
+                    self.request_timeout.total_seconds()
+                ), self._session.get(
+                    f"{self._hostname}/cgi-bin/{name}.xml",
+                    params={"sdate": day.strftime("%y%m%d"), "days": 1},
+                ) as resp:
+                    if resp.status != 200:
+                        return None
+                    document = await resp.read()
+            except (
+                asyncio.TimeoutError,
+                aiohttp.ClientConnectionError,
+                aiohttp.ClientResponseError,
+            ):
+                return None
+
+        try:
+            return fromstring(document)
+        except ParseError as err:
+            _LOGGER.warning(
+                "Apex at %s sent an invalid %s: %s", self.hostname, name, err
+            )
+            return None
+
+    async def post_status_update(self, payload) -> bool:
+        """Send a payload to the status CGI bridge once no other request is in flight.
+
+        Payloads are refused straight away while the circuit breaker is open.
+        """
+        if self.breaker.state == BreakerState.OPEN:
+            return False
+        async with self._requests:
+            start = monotonic()
+            try:
+                async with async_timeout.timeout(self.request_timeout.total_seconds()):
+                    accepted = await super().post_status_update(payload)
+            except asyncio.TimeoutError:
+                accepted = False
+        if self.capture is not None:
+            self.capture.record_command(monotonic() - start, dict(payload), accepted)
+        return accepted
+
+    async def _get_xml_by_name(self, name: str) -> BeautifulSoup | None:
+        """Download an XML document once no other request is in flight."""
+        async with self._requests:
+            try:
+                async with async_timeout.timeout(self.request_timeout.total_seconds()):
+                    return await super()._get_xml_by_name(name)
+            except asyncio.TimeoutError:
+                return None
+
+
+class ApexConnectionManager:
+    """Own one ManagedApexConnection per Apex host for the config flow, coordinators, and outlets.
+
+    Connections are reference counted, and share an HTTP session whose connector
+    keeps a bounded number of connections to each host alive for reuse.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the manager."""
+        self._hass = hass
+        self._session: aiohttp.ClientSession | None = None
+        # Connections and how many users each has, keyed by normalized host
+        self._connections: dict[str, tuple[ManagedApexConnection, int]] = {}
+
+    @callback
+    def async_acquire(
+        self,
+        hostname: str,
+        username: str | None,
+        password: str | None,
+    ) -> ManagedApexConnection:
+        """Get the connection to an Apex, creating it if nobody is using it yet.
+
+        Credentials given replace those of a connection already in use; users which
+        don't control outlets pass none and leave them as they are.
+        """
+        key = hostname.lower()
+        if key in self._connections:
+            conn, users = self._connections[key]
+            if username is not None:
+                conn.set_credentials(username, password)
+            self._connections[key] = (conn, users + 1)
+            return conn
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    ssl=False,
+                    limit_per_host=DEFAULT_MAX_REQUESTS_IN_FLIGHT,
+                    keepalive_timeout=CONNECTION_KEEPALIVE_TIMEOUT.total_seconds(),
+                )
+            )
+        conn = ManagedApexConnection(
+            hostname,
+            self._session,
+            username,
+            password,
+            DEFAULT_MAX_REQUESTS_IN_FLIGHT,
+        )
+        self._connections[key] = (conn, 1)
+        _LOGGER.debug("Opened connection to Apex at %s", hostname)
+        return conn
+
+    async def async_release(self, conn: ManagedApexConnection) -> None:
+        """Stop using a connection, closing the HTTP session once no connections are left."""
+        key = conn.hostname.lower()
+        if key not in self._connections:
+            return
+        _, users = self._connections[key]
+        if users > 1:
+            self._connections[key] = (conn, users - 1)
+            return
+
+        del self._connections[key]
+        if conn.capture is not None:
+            await conn.capture.async_close()
+            conn.capture = None
+        _LOGGER.debug("Closed connection to Apex at %s", conn.hostname)
+        if not self._connections:
+            await self.async_close()
+
+    async def async_close(self, _event: Event | None = None) -> None:
+        """Write out the connections' captures and close their shared HTTP session."""
+        for conn, _ in self._connections.values():
+            if conn.capture is not None:
+                await conn.capture.async_close()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+@callback
+def async_get_connection_manager(hass: HomeAssistant) -> ApexConnectionManager:
+    """Get the connection manager shared by every Apex entry and config flow."""
+    if DATA_CONNECTION_MANAGER not in hass.data:
+        manager = ApexConnectionManager(hass)
+        hass.data[DATA_CONNECTION_MANAGER] = manager
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, manager.async_close)
+    return hass.data[DATA_CONNECTION_MANAGER]
@@ -5,11 +5,186 @@ DOMAIN = "neptune_apex_classic"
 DEFAULT_NAME = "Apex Classic"
 DEFAULT_USERNAME = "admin"
 DEFAULT_PASSWORD = "1234"
+DEFAULT_NETWORK = "192.168.1.0/24"
 
 # Constants used to access cached data from component setup in the individual sensors
 DATA_KEY_CONNECTION = "connection"
 DATA_KEY_COORDINATOR = "coordinator"
+DATA_KEY_INVENTORY = "inventory"
+DATA_KEY_COMMAND_QUEUE = "command-queue"
+DATA_KEY_PLATFORMS = "platforms"
+
+# Key of the connection manager shared by all Apex entries in hass.data
+DATA_CONNECTION_MANAGER = f"{DOMAIN}_connections"
+
+# Key of the fleet spreading out the polls of all Apex entries in hass.data
+DATA_FLEET = f"{DOMAIN}_fleet"
+
+# Key of the connections and inventories kept between unloading and setting up an
+# Apex entry again in hass.data, and how long they are kept before being released
+DATA_RELOADS = f"{DOMAIN}_reloads"
+RELOAD_GRACE = timedelta(seconds=30)
+
+# Key of the metrics exporter serving every Apex in hass.data, and where it's served
+DATA_EXPORTER = f"{DOMAIN}_exporter"
+METRICS_URL = f"/api/{DOMAIN}/metrics"
+
+# Key of the subnet scanner shared by config flows in hass.data
+DATA_SCANNER = f"{DOMAIN}_scanner"
+
+# Dispatcher signals sent when an Apex starts reporting new probes or outlets, and when
+# it stops reporting the probe or outlet with a key
+SIGNAL_INVENTORY_ADDED = f"{DOMAIN}_inventory_added_{{serial_number}}"
+SIGNAL_INVENTORY_REMOVED = f"{DOMAIN}_inventory_removed_{{serial_number}}_{{key}}"
+
+# Fired on the event bus as soon as a poll sees an outlet change state, or a probe
+# reading cross one of its thresholds
+EVENT_OUTLET_CHANGED = f"{DOMAIN}_outlet_changed"
+EVENT_PROBE_THRESHOLD = f"{DOMAIN}_probe_threshold"
 
 CONFIG_KEY_SERIAL_NUMBER = "serial-number"
+CONFIG_KEY_MIN_UPDATE_INTERVAL = "min-update-interval"
+CONFIG_KEY_MAX_UPDATE_INTERVAL = "max-update-interval"
+CONFIG_KEY_OPTIMISTIC_OUTLETS = "optimistic-outlets"
+CONFIG_KEY_OPTIMISTIC_TIMEOUT = "optimistic-timeout"
+CONFIG_KEY_STATUS_FRESHNESS = "status-freshness"
+CONFIG_KEY_HISTORY_INTERVAL = "history-interval"
+CONFIG_KEY_LINE_VOLTAGE = "line-voltage"
+CONFIG_KEY_REQUEST_TIMEOUT = "request-timeout"
+CONFIG_KEY_THRESHOLDS = "thresholds"
+CONFIG_KEY_NETWORK = "network"
+CONFIG_KEY_CONTROLLERS = "controllers"
+CONFIG_KEY_EXCLUDED = "excluded"
+CONFIG_KEY_SLOW = "slow"
+CONFIG_KEY_SLOW_INTERVAL = "slow-interval"
+CONFIG_KEY_CAPTURE = "capture"
+
+# Limits of a probe's threshold in the options, and the levels its readings can be at
+THRESHOLD_LOW = "low"
+THRESHOLD_HIGH = "high"
+THRESHOLD_HYSTERESIS = "hysteresis"
+THRESHOLD_NORMAL = "normal"
+
+# State attribute holding an outlet state which was requested but not yet confirmed
+ATTR_PENDING_STATE = "pending_state"
+
+# State attributes of a probe's trend sensor, describing the last finished period
+ATTR_MIN = "min"
+ATTR_MAX = "max"
+ATTR_PERIOD_START = "period_start"
+
+# State attribute of a probe's threshold sensor, holding the level of its reading
+ATTR_LEVEL = "level"
+
+# State attributes of an Apex's circuit breaker sensor
+ATTR_FAILURES = "failures"
+ATTR_RETRY_IN = "retry_in"
+
+# Data of the events fired for an Apex
+ATTR_SERIAL_NUMBER = "serial_number"
+ATTR_OUTLET = "outlet"
+ATTR_PROBE = "probe"
+ATTR_VALUE = "value"
+ATTR_OLD_STATE = "old_state"
+ATTR_NEW_STATE = "new_state"
+
+# Requests in flight to one Apex at a time, and how long idle HTTP connections to it are
+# kept open for reuse
+DEFAULT_MAX_REQUESTS_IN_FLIGHT = 1
+CONNECTION_KEEPALIVE_TIMEOUT = timedelta(seconds=15)
+
+# Default time (in seconds) a request to the Apex may take before it is abandoned
+DEFAULT_REQUEST_TIMEOUT = 10
+
+# Failed requests in a row which open an Apex's circuit breaker, and how long it stays
+# open: the base backoff grows by the factor each time it opens again, up to the
+# maximum, and is shortened by a random fraction of up to the jitter
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BASE_BACKOFF = timedelta(seconds=15)
+BREAKER_BACKOFF_FACTOR = 2
+BREAKER_MAX_BACKOFF = timedelta(minutes=10)
+BREAKER_JITTER = 0.5
+
+# Version of the status documents saved in Home Assistant storage, and how often one
+# is saved while the probes and outlets stay the same
+STORAGE_VERSION = 1
+STATUS_CACHE_SAVE_INTERVAL = timedelta(minutes=15)
 
+# Status downloads which may run at the same time across every Apex
+DEFAULT_MAX_CONCURRENT_FETCHES = 2
+
+# Bytes of the status document parsed at a time while it downloads
+STATUS_CHUNK_SIZE = 4096
+
+# Status refreshes requested within this many seconds of the last download reuse it
+DEFAULT_STATUS_FRESHNESS = 1
+
+# Default poll interval, and the default bounds (in seconds) the adaptive poll
+# scheduler may move it between
 TIME_BETWEEN_UPDATES = timedelta(seconds=10)
+DEFAULT_MIN_UPDATE_INTERVAL = 2
+DEFAULT_MAX_UPDATE_INTERVAL = 60
+
+# How long to poll at the minimum interval after an outlet changes or a probe moves quickly
+FAST_POLL_DURATION = timedelta(seconds=60)
+# Responses slower than this make the scheduler back off instead of polling faster
+SLOW_RESPONSE_THRESHOLD = timedelta(seconds=3)
+POLL_BACKOFF_FACTOR = 1.5
+
+# Outlet commands are sent no closer together than this, and requested refreshes (e.g.
+# after a batch of commands) are merged if they arrive within the cooldown
+TIME_BETWEEN_COMMANDS = timedelta(milliseconds=250)
+REQUEST_REFRESH_COOLDOWN = timedelta(seconds=1)
+
+# By default requested outlet states are shown until a poll confirms them, for up to
+# this many seconds
+DEFAULT_OPTIMISTIC_OUTLETS = True
+DEFAULT_OPTIMISTIC_TIMEOUT = 30
+
+# Probe readings which move less than this from the last value written to Home Assistant
+# are not written again, keyed by probe type
+PROBE_DEADBANDS = {"Temp": 0.05, "ORP": 2.0}
+
+# Probe readings changing faster than this many units per minute make the Apex poll faster,
+# keyed by probe type
+PROBE_FAST_CHANGE_RATES = {"Temp": 0.5, "ORP": 20.0, "Amps": 1.0}
+
+# Probe types whose readings are kept in each Apex's history, how many raw readings of
+# each probe are kept, and how many periods of min/mean/max aggregates
+HISTORY_PROBE_TYPES = ("Temp", "ORP", "Amps")
+HISTORY_RAW_SAMPLES = 360
+HISTORY_PERIODS = 288
+
+# Default length (in minutes) of the periods probe readings are aggregated over
+DEFAULT_HISTORY_INTERVAL = 5
+
+# Number of recent polls summarized by the performance diagnostics
+METRICS_WINDOW = 100
+
+# Days of the Apex's datalog and outlet log imported into statistics at most, both
+# the first time and after a long outage
+LOG_IMPORT_DAYS = 7
+
+# Default interval (in seconds) at which probes and outlets on the slow tier are read
+DEFAULT_SLOW_INTERVAL = 300
+
+# Default line voltage (in volts) current probe readings are converted to power at, and
+# the energy (in kWh) a total must grow by before the energy sensor is written again
+DEFAULT_LINE_VOLTAGE = 120
+ENERGY_RESOLUTION = 0.001
+
+# Subnet scans probe at most this many addresses at once, wait this long for each to
+# answer, refuse subnets with more addresses than this, and reuse their results for
+# this long
+DISCOVERY_MAX_PROBES = 64
+DISCOVERY_TIMEOUT = timedelta(seconds=2)
+DISCOVERY_MAX_ADDRESSES = 1024
+DISCOVERY_CACHE_TTL = timedelta(minutes=5)
+
+# Whether status downloads and outlet commands are recorded to a capture file by
+# default, the directory under the configuration directory captures are written to,
+# how often buffered records are written out, and the version of the capture format
+DEFAULT_CAPTURE = False
+CAPTURE_DIRECTORY = f"{DOMAIN}_captures"
+CAPTURE_FLUSH_INTERVAL = timedelta(seconds=60)
+CAPTURE_VERSION = 1
@@ -0,0 +1,513 @@
+"""Coordinator which polls an Apex and tracks which values changed."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime, timedelta
+import logging
+from time import monotonic, time
+from typing import Any
+
+from neptune_apex_classic.outlet import Outlet
+
+from homeassistant.const import ATTR_NAME
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util.dt import utcnow
+
+from .const import (
+    ATTR_NEW_STATE,
+    ATTR_OLD_STATE,
+    ATTR_OUTLET,
+    ATTR_PROBE,
+    ATTR_SERIAL_NUMBER,
+    ATTR_VALUE,
+    DEFAULT_HISTORY_INTERVAL,
+    DEFAULT_LINE_VOLTAGE,
+    DEFAULT_SLOW_INTERVAL,
+    ENERGY_RESOLUTION,
+    EVENT_OUTLET_CHANGED,
+    EVENT_PROBE_THRESHOLD,
+    HISTORY_PERIODS,
+    HISTORY_PROBE_TYPES,
+    HISTORY_RAW_SAMPLES,
+    PROBE_DEADBANDS,
+    PROBE_FAST_CHANGE_RATES,
+    REQUEST_REFRESH_COOLDOWN,
+)
+from .breaker import BreakerState
+from .connection import ManagedApexConnection
+from .energy import EnergyMeter, energy_key
+from .fleet import async_get_fleet
+from .history import ProbeHistory, trend_key
+from .metrics import RollingStatistic
+from .parser import ApexReadings
+from .scheduler import AdaptivePollScheduler
+from .thresholds import ProbeThreshold, threshold_key
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ApexStatus:
+    """Snapshot of the probe and outlet values last published to entities."""
+
+    def __init__(self) -> None:
+        """Initialize an empty snapshot."""
+        # Probe values keyed by probe_key(), outlet states keyed by device ID
+        self.probes: dict[str, str] = {}
+        self.outlets: dict[str, str] = {}
+        # Whether the last update saw an outlet change or a probe move quickly
+        self.urgent = False
+        # Device IDs and old states of the outlets the last update saw change
+        self.outlet_changes: list[tuple[str, str]] = []
+
+    def update(self, readings: ApexReadings, elapsed: float | None) -> set[str]:
+        """Merge freshly downloaded readings and return the keys that changed.
+
+        `elapsed` is the number of seconds since the previous update, if there was one.
+        """
+        changed = set[str]()
+        self.urgent = False
+        self.outlet_changes = []
+
+        for key, value in readings.probes.items():
+            old = self.probes.get(key)
+            probe_type = readings.probe_types[key]
+            if _probe_changed(probe_type, old, value):
+                if old is not None and elapsed:
+                    self.urgent |= _probe_moved_fast(probe_type, old, value, elapsed)
+                self.probes[key] = value
+                changed.add(key)
+
+        for device_id, state in readings.outlets.items():
+            old = self.outlets.get(device_id)
+            if old != state:
+                if old is not None:
+                    self.urgent = True
+                    self.outlet_changes.append((device_id, old))
+                self.outlets[device_id] = state
+                changed.add(device_id)
+
+        if readings.inventory_changed:
+            for key in self.probes.keys() - readings.probes.keys():
+                del self.probes[key]
+            for key in self.outlets.keys() - readings.outlets.keys():
+                del self.outlets[key]
+
+        return changed
+
+
+def _probe_changed(probe_type: str, old: str | None, new: str) -> bool:
+    """Determine whether a probe reading moved outside of its type's deadband."""
+    if old is None:
+        return True
+    deadband = PROBE_DEADBANDS.get(probe_type)
+    if deadband is None:
+        return old != new
+    try:
+        return abs(float(new) - float(old)) >= deadband
+    except ValueError:
+        return old != new
+
+
+def _probe_moved_fast(probe_type: str, old: str, new: str, elapsed: float) -> bool:
+    """Determine whether a probe reading is changing faster than its type's rate."""
+    rate = PROBE_FAST_CHANGE_RATES.get(probe_type)
+    if rate is None:
+        return False
+    try:
+        return abs(float(new) - float(old)) * 60 / elapsed >= rate
+    except ValueError:
+        return False
+
+
+def _probe_value(readings: ApexReadings, key: str) -> float | None:
+    """Get the numeric reading of a probe, if it has one."""
+    try:
+        return float(readings.probes[key])
+    except (KeyError, ValueError):
+        return None
+
+
+def _outlet_state_confirmed(requested: str, actual: str | None) -> bool:
+    """Determine whether an outlet's reported state satisfies a requested ON, OFF, or AUTO."""
+    if requested == Outlet.AUTO:
+        return actual in [Outlet.AUTO_ON, Outlet.AUTO_OFF]
+    return actual == requested
+
+
+class ApexDataUpdateCoordinator(DataUpdateCoordinator[ApexStatus]):
+    """Poll an Apex and remember which probes and outlets changed on the last update.
+
+    Polls are scheduled through the fleet shared by every Apex, which staggers them
+    and limits how many download at once. Listeners added with a key as their context
+    are only called when that key changes or availability does, and outlet changes
+    are fired on the event bus as soon as they are seen. Probes and outlets on the
+    slow tier are only read from the status every `slow_interval`.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        conn: ManagedApexConnection,
+        name: str,
+        scheduler: AdaptivePollScheduler,
+        device_info: DeviceInfo,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=name,
+            update_interval=scheduler.interval,
+            request_refresh_debouncer=Debouncer(
+                hass,
+                _LOGGER,
+                cooldown=REQUEST_REFRESH_COOLDOWN.total_seconds(),
+                immediate=False,
+            ),
+        )
+        self.conn = conn
+        self.scheduler = scheduler
+        self.fleet = async_get_fleet(hass)
+        self.device_info = device_info
+        self.changed = set[str]()
+        self.skipped_writes = 0
+        # Entities written while notifying listeners, milliseconds spent in each
+        # update, and the number of entities written after each notification
+        self.entity_writes = 0
+        self.update_time = RollingStatistic()
+        self.written_entities = RollingStatistic()
+        # Milliseconds between when a poll was due and when its values were published,
+        # and when the next poll is due before the fleet staggers it
+        self.data_lag = RollingStatistic()
+        self._poll_due: datetime | None = None
+        # How long a requested outlet state is shown before a poll must confirm it,
+        # or None to only show states reported by the Apex
+        self.optimistic_timeout: timedelta | None = None
+        # Recent readings of numeric probes keyed by probe_key(), and the length of
+        # the periods they are aggregated over
+        self.history: dict[str, ProbeHistory] = {}
+        self.history_period = timedelta(minutes=DEFAULT_HISTORY_INTERVAL)
+        # Energy drawn through each current probe keyed by probe_key(), and the line
+        # voltage its readings are converted to power at
+        self.energy: dict[str, EnergyMeter] = {}
+        self.line_voltage: float = DEFAULT_LINE_VOLTAGE
+        # How often probes and outlets on the slow tier are read, and when they are
+        # next due in monotonic seconds
+        self.slow_interval = timedelta(seconds=DEFAULT_SLOW_INTERVAL)
+        self._slow_due_at = 0.0
+        # Thresholds on probe readings keyed by probe_key()
+        self.thresholds: dict[str, ProbeThreshold] = {}
+        # Requested outlet states and when they expire, keyed by device ID
+        self._requested_outlets: dict[str, tuple[str, float]] = {}
+        self._status = ApexStatus()
+        self._last_update: float | None = None
+        # Listeners keyed by the key they follow, or None for those following every
+        # update, and the availability they were last called with
+        self._keyed_listeners: dict[str | None, dict[CALLBACK_TYPE, CALLBACK_TYPE]] = {}
+        self._notified_success: bool | None = None
+
+    def requested_outlet_state(self, device_id: str) -> str | None:
+        """Get the ON, OFF, or AUTO state requested for an outlet which no poll has confirmed yet."""
+        requested = self._requested_outlets.get(device_id)
+        return None if requested is None else requested[0]
+
+    @callback
+    def async_set_requested_outlet_state(self, device_id: str, state: str) -> None:
+        """Show a requested outlet state until a poll confirms it or it times out."""
+        if self.optimistic_timeout is None:
+            return
+        self._requested_outlets[device_id] = (
+            state,
+            monotonic() + self.optimistic_timeout.total_seconds(),
+        )
+        self._async_update_keys({device_id})
+
+    @callback
+    def async_cancel_requested_outlet_state(self, device_id: str) -> None:
+        """Go back to showing the reported state of an outlet."""
+        if self._requested_outlets.pop(device_id, None) is not None:
+            self._async_update_keys({device_id})
+
+    def set_history_period(self, period: timedelta) -> None:
+        """Change the length of the periods probe readings are aggregated over."""
+        self.history_period = period
+        for history in self.history.values():
+            history.period = period.total_seconds()
+
+    @callback
+    def async_set_line_voltage(self, voltage: float) -> None:
+        """Change the line voltage and update the power of every current probe."""
+        if voltage == self.line_voltage:
+            return
+        self.line_voltage = voltage
+        if self.data is not None:
+            self._async_update_keys(
+                {
+                    key
+                    for key, probe_type in self.conn.readings.probe_types.items()
+                    if probe_type == "Amps"
+                }
+            )
+
+    @callback
+    def async_set_thresholds(self, thresholds: dict[str, dict[str, Any]]) -> None:
+        """Replace the probe thresholds with those saved in an entry's options.
+
+        The levels of the current readings are worked out right away, without firing
+        events, so threshold sensors show them without waiting for a poll.
+        """
+        self.thresholds = {
+            key: ProbeThreshold.from_options(options)
+            for key, options in thresholds.items()
+        }
+        for key, threshold in self.thresholds.items():
+            if (value := _probe_value(self.conn.readings, key)) is not None:
+                threshold.evaluate(value)
+        if self.data is not None:
+            self._async_update_keys({threshold_key(key) for key in self.thresholds})
+
+    def restore_energy(self, key: str, total: float) -> None:
+        """Continue a current probe's energy from a total saved before a restart."""
+        self._energy_meter(key).restore(total)
+
+    @callback
+    def async_load_cached(self) -> None:
+        """Publish readings loaded from a saved status as unavailable until a poll succeeds."""
+        self._status.update(self.conn.readings, None)
+        self.data = self._status
+        self.last_update_success = False
+
+    @callback
+    def async_poll_soon(self) -> None:
+        """Poll at the scheduler's minimum interval for a while, starting now."""
+        self.scheduler.boost()
+        self.update_interval = self.scheduler.interval
+        if self._listeners:
+            self._schedule_refresh()
+
+    @callback
+    def async_add_listener(
+        self, update_callback: CALLBACK_TYPE, context: Any = None
+    ) -> Callable[[], None]:
+        """Listen for updates, only of the key given as context if there is one."""
+        remove_listener = super().async_add_listener(update_callback, context)
+        listeners = self._keyed_listeners.setdefault(context, {})
+        listeners[remove_listener] = update_callback
+
+        @callback
+        def remove_keyed_listener() -> None:
+            """Remove the listener from its key."""
+            remove_listener()
+            del listeners[remove_listener]
+            if not listeners and self._keyed_listeners.get(context) is listeners:
+                del self._keyed_listeners[context]
+
+        return remove_keyed_listener
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the listeners of changed keys and count how many entities wrote state."""
+        self.entity_writes = 0
+        if self.last_update_success != self._notified_success:
+            # Every entity shows whether the Apex is available
+            super().async_update_listeners()
+            self._notified_success = self.last_update_success
+        else:
+            called = 0
+            for key in (None, *self.changed):
+                for update_callback in list(
+                    self._keyed_listeners.get(key, {}).values()
+                ):
+                    update_callback()
+                    called += 1
+            self.skipped_writes += len(self._listeners) - called
+        self.written_entities.record(self.entity_writes)
+
+    @callback
+    def _schedule_refresh(self) -> None:
+        """Schedule the next poll in a slot clear of the other Apexes' polls."""
+        interval = self.update_interval
+        if interval is None:
+            return
+        # Due when DataUpdateCoordinator would schedule it, on this coordinator's microsecond
+        self._poll_due = utcnow().replace(microsecond=self._microsecond) + interval
+        self.update_interval = interval + self.fleet.async_stagger(
+            self, self._poll_due, interval
+        )
+        try:
+            super()._schedule_refresh()
+        finally:
+            self.update_interval = interval
+
+    @callback
+    def _async_update_keys(self, keys: set[str]) -> None:
+        """Notify the entities displaying these keys without polling the Apex."""
+        self.changed = keys
+        self.async_update_listeners()
+
+    async def _async_update_data(self) -> ApexStatus:
+        """Download the status from the Apex and record which values changed."""
+        self.changed = set()
+        readings = self.conn.readings
+        async with self.fleet.fetches:
+            start = monotonic()
+            readings.slow_due = start >= self._slow_due_at
+            refreshed = await self.conn.refresh()
+        if not refreshed:
+            breaker = self.conn.breaker
+            if breaker.state == BreakerState.OPEN:
+                # Poll again when the breaker lets a request through
+                self.update_interval = max(
+                    self.scheduler.min_interval, timedelta(seconds=breaker.retry_in())
+                )
+                raise UpdateFailed(
+                    f"{self.name} is not responding, trying again in "
+                    f"{self.update_interval.total_seconds():.0f} seconds"
+                )
+            self.update_interval = self.scheduler.failed_interval()
+            raise UpdateFailed(f"Unable to read the status of {self.name}")
+
+        now = monotonic()
+        if readings.slow_due:
+            self._slow_due_at = start + self.slow_interval.total_seconds()
+        elapsed = None if self._last_update is None else now - self._last_update
+        self._last_update = now
+        self.changed = self._status.update(readings, elapsed)
+        # Derived keys added below change on their own, so only readings count
+        values_changed = bool(self.changed)
+        self._reconcile_requested_outlets(now)
+        self._record_history(time())
+        self._record_energy(now)
+        self._fire_outlet_events()
+        self._evaluate_thresholds()
+        self.update_interval = self.scheduler.next_interval(
+            values_changed, self._status.urgent, now - start
+        )
+        self.update_time.record((monotonic() - start) * 1000)
+        if self._poll_due is not None:
+            lag = utcnow() - self._poll_due
+            # Refreshes requested before the poll was due don't lag behind it
+            if lag >= timedelta(0):
+                self.data_lag.record(lag.total_seconds() * 1000)
+        _LOGGER.debug(
+            "%s values changed on %s (%s writes skipped so far), next poll in %s",
+            len(self.changed),
+            self.name,
+            self.skipped_writes,
+            self.update_interval,
+        )
+        return self._status
+
+    def _record_history(self, timestamp: float) -> None:
+        """Add every numeric probe's reading to its history, noting finished periods."""
+        readings = self.conn.readings
+        if readings.inventory_changed:
+            for key in self.history.keys() - readings.probes.keys():
+                del self.history[key]
+
+        for key, value in readings.probes.items():
+            if readings.probe_types[key] not in HISTORY_PROBE_TYPES:
+                continue
+            try:
+                reading = float(value)
+            except ValueError:
+                continue
+            if (history := self.history.get(key)) is None:
+                history = self.history[key] = ProbeHistory(
+                    HISTORY_RAW_SAMPLES,
+                    HISTORY_PERIODS,
+                    self.history_period.total_seconds(),
+                )
+            if history.record(timestamp, reading):
+                self.changed.add(trend_key(key))
+
+    def _fire_outlet_events(self) -> None:
+        """Fire an event for every outlet the last poll saw change state."""
+        readings = self.conn.readings
+        for device_id, old_state in self._status.outlet_changes:
+            self.hass.bus.async_fire(
+                EVENT_OUTLET_CHANGED,
+                {
+                    ATTR_SERIAL_NUMBER: readings.serial,
+                    ATTR_OUTLET: device_id,
+                    ATTR_NAME: readings.outlet_names.get(device_id),
+                    ATTR_OLD_STATE: old_state,
+                    ATTR_NEW_STATE: self._status.outlets[device_id],
+                },
+            )
+
+    def _evaluate_thresholds(self) -> None:
+        """Work out the level of every probe with a threshold, firing events for crossings."""
+        readings = self.conn.readings
+        for key, threshold in self.thresholds.items():
+            if (value := _probe_value(readings, key)) is None:
+                continue
+            old_level = threshold.level
+            if not threshold.evaluate(value):
+                continue
+            self.changed.add(threshold_key(key))
+            if old_level is None:
+                continue
+            self.hass.bus.async_fire(
+                EVENT_PROBE_THRESHOLD,
+                {
+                    ATTR_SERIAL_NUMBER: readings.serial,
+                    ATTR_PROBE: key,
+                    ATTR_NAME: key[: -len(readings.probe_types[key]) - 1],
+                    ATTR_VALUE: value,
+                    ATTR_OLD_STATE: old_level,
+                    ATTR_NEW_STATE: threshold.level,
+                },
+            )
+
+    def _record_energy(self, timestamp: float) -> None:
+        """Add the energy each current probe drew since the last poll."""
+        readings = self.conn.readings
+        if readings.inventory_changed:
+            for key in self.energy.keys() - readings.probes.keys():
+                del self.energy[key]
+
+        for key, value in readings.probes.items():
+            if readings.probe_types[key] != "Amps":
+                continue
+            try:
+                amps = float(value)
+            except ValueError:
+                continue
+            meter = self._energy_meter(key)
+            meter.record(timestamp, amps, self.line_voltage)
+            if meter.publish(ENERGY_RESOLUTION):
+                self.changed.add(energy_key(key))
+
+    def _energy_meter(self, key: str) -> EnergyMeter:
+        """Get the energy meter of a current probe, creating it if needed."""
+        # Polls are at most the longest interval apart, so allow for one missed poll
+        max_gap = 2 * self.scheduler.max_interval.total_seconds()
+        if (meter := self.energy.get(key)) is None:
+            meter = self.energy[key] = EnergyMeter(max_gap)
+        meter.max_gap = max_gap
+        return meter
+
+    def _reconcile_requested_outlets(self, now: float) -> None:
+        """Stop showing requested outlet states which were confirmed or timed out."""
+        for device_id, (state, expires) in list(self._requested_outlets.items()):
+            actual = self._status.outlets.get(device_id)
+            if _outlet_state_confirmed(state, actual):
+                _LOGGER.debug(
+                    "%s confirmed state %s for %s", self.name, state, device_id
+                )
+            elif now >= expires:
+                _LOGGER.warning(
+                    "%s did not confirm state %s for %s in time, showing %s again",
+                    self.name,
+                    state,
+                    device_id,
+                    actual,
+                )
+            else:
+                continue
+            del self._requested_outlets[device_id]
+            self.changed.add(device_id)
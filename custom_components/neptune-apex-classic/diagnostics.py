@@ -0,0 +1,66 @@
+"""Diagnostics for an Apex entry, including how long polls and state writes take."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    CONFIG_KEY_SERIAL_NUMBER,
+    DATA_KEY_CONNECTION,
+    DATA_KEY_COORDINATOR,
+    DATA_KEY_INVENTORY,
+    DOMAIN,
+)
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for an Apex entry."""
+    apex_data = hass.data[DOMAIN][config.data[CONFIG_KEY_SERIAL_NUMBER]]
+    conn = apex_data[DATA_KEY_CONNECTION]
+    coordinator = apex_data[DATA_KEY_COORDINATOR]
+    inventory = apex_data[DATA_KEY_INVENTORY]
+
+    return {
+        "entry": {
+            "data": async_redact_data(config.data, TO_REDACT),
+            "options": dict(config.options),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds(),
+            "skipped_writes": coordinator.skipped_writes,
+            "shared_refreshes": conn.shared_refreshes,
+        },
+        "breaker": conn.breaker.as_dict(),
+        "metrics": {
+            "status_fetch_ms": conn.fetch_time.as_dict(),
+            "status_parse_ms": conn.parse_time.as_dict(),
+            "update_ms": coordinator.update_time.as_dict(),
+            "written_entities": coordinator.written_entities.as_dict(),
+            "data_lag_ms": coordinator.data_lag.as_dict(),
+        },
+        "fleet": {
+            "size": coordinator.fleet.size,
+            "next_poll": coordinator.fleet.next_poll(coordinator),
+        },
+        "inventory": {
+            "probes": [f"{probe.name} ({probe.type})" for probe in inventory.probes],
+            "outlets": [outlet.device_id for outlet in inventory.outlets],
+        },
+        "status": {
+            "probes": coordinator.data.probes,
+            "outlets": coordinator.data.outlets,
+        },
+        "history": {
+            key: {"aggregates": history.aggregates(), "samples": history.samples()}
+            for key, history in coordinator.history.items()
+        },
+    }
@@ -0,0 +1,110 @@
+"""Discovery of Apex Classic controllers by scanning a subnet."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from ipaddress import IPv4Address, IPv4Network
+import logging
+from time import monotonic
+from xml.etree.ElementTree import ParseError, fromstring
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import (
+    DATA_SCANNER,
+    DISCOVERY_CACHE_TTL,
+    DISCOVERY_MAX_PROBES,
+    DISCOVERY_TIMEOUT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DiscoveredApex:
+    """An Apex Classic which answered a scan."""
+
+    host: str
+    serial_number: str
+    # Hostname the Apex was given in its own network settings
+    hostname: str
+
+
+class ApexScanner:
+    """Find Apex Classics on a subnet by asking every address for its status.
+
+    Addresses are probed concurrently, at most DISCOVERY_MAX_PROBES at a time and for
+    at most DISCOVERY_TIMEOUT each, so hosts which don't answer only cost their
+    timeout. The results of each subnet are remembered for DISCOVERY_CACHE_TTL, so
+    going back and forth in the config flow doesn't scan again.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the scanner."""
+        self._hass = hass
+        # When each subnet was scanned and the Apexes found on it
+        self._results: dict[IPv4Network, tuple[float, list[DiscoveredApex]]] = {}
+
+    async def async_scan(self, network: IPv4Network) -> list[DiscoveredApex]:
+        """Return the Apexes on a subnet, scanning it unless it was scanned recently."""
+        if (cached := self._results.get(network)) is not None:
+            scanned, found = cached
+            if monotonic() - scanned < DISCOVERY_CACHE_TTL.total_seconds():
+                return found
+
+        start = monotonic()
+        session = async_get_clientsession(self._hass, verify_ssl=False)
+        probes = asyncio.Semaphore(DISCOVERY_MAX_PROBES)
+        answers = await asyncio.gather(
+            *(self._async_probe(session, probes, host) for host in network.hosts())
+        )
+        found = [apex for apex in answers if apex is not None]
+        self._results[network] = (monotonic(), found)
+        _LOGGER.info(
+            "Found %s Apex controllers on %s in %.1f seconds",
+            len(found),
+            network,
+            monotonic() - start,
+        )
+        return found
+
+    async def _async_probe(
+        self,
+        session: aiohttp.ClientSession,
+        probes: asyncio.Semaphore,
+        address: IPv4Address,
+    ) -> DiscoveredApex | None:
+        """Ask one address for an Apex status, returning the Apex if it answers."""
+        host = str(address)
+        async with probes:
+            try:
+                async with session.get(
+                    f"http://{host}/cgi-bin/status.xml",
+                    timeout=aiohttp.ClientTimeout(
+                        total=DISCOVERY_TIMEOUT.total_seconds()
+                    ),
+                ) as resp:
+                    if resp.status != 200:
+                        return None
+                    document = await resp.read()
+            except (asyncio.TimeoutError, aiohttp.ClientError):
+                return None
+
+        try:
+            status = fromstring(document)
+        except ParseError:
+            return None
+        if status.tag != "status" or not (serial := status.findtext("serial")):
+            return None
+        return DiscoveredApex(host, serial, status.findtext("hostname") or host)
+
+
+@callback
+def async_get_scanner(hass: HomeAssistant) -> ApexScanner:
+    """Get the scanner shared by every config flow."""
+    if DATA_SCANNER not in hass.data:
+        hass.data[DATA_SCANNER] = ApexScanner(hass)
+    return hass.data[DATA_SCANNER]
@@ -0,0 +1,48 @@
+"""Power and energy derived from the readings of current probes."""
+from __future__ import annotations
+
+
+def energy_key(key: str) -> str:
+    """Return the key used to track the energy of the current probe with a probe_key()."""
+    return f"{key}-energy"
+
+
+class EnergyMeter:
+    """Running total of the energy drawn through one current probe.
+
+    Power is the probe's current times the line voltage, and is integrated between
+    consecutive polls with the trapezoidal rule. Polls further apart than `max_gap`
+    seconds aren't integrated across, since nothing is known about the power between
+    them.
+    """
+
+    def __init__(self, max_gap: float) -> None:
+        """Initialize a meter at zero."""
+        self.max_gap = max_gap
+        # Total energy in kWh, and the total last published to the energy sensor
+        self.total = 0.0
+        self.published = 0.0
+        # Time and power of the previous reading
+        self._last: tuple[float, float] | None = None
+
+    def record(self, timestamp: float, amps: float, voltage: float) -> None:
+        """Add the energy drawn since the previous reading; `timestamp` is in seconds."""
+        watts = amps * voltage
+        if self._last is not None:
+            last_timestamp, last_watts = self._last
+            elapsed = timestamp - last_timestamp
+            if 0 < elapsed <= self.max_gap:
+                self.total += (last_watts + watts) / 2 * elapsed / 3_600_000
+        self._last = (timestamp, watts)
+
+    def restore(self, total: float) -> None:
+        """Continue counting from a total saved before a restart."""
+        self.total += total
+        self.published = self.total
+
+    def publish(self, resolution: float) -> bool:
+        """Mark the total published if it moved by at least `resolution` kWh."""
+        if self.total - self.published < resolution:
+            return False
+        self.published = self.total
+        return True
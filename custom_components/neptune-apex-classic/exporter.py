@@ -0,0 +1,262 @@
+"""Prometheus text and JSON endpoint serving the latest readings of every Apex."""
+from __future__ import annotations
+
+from time import time
+from typing import Any
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.const import CONTENT_TYPE_JSON, CONTENT_TYPE_TEXT_PLAIN
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.json import json_bytes
+
+from .breaker import BreakerState
+from .const import DATA_EXPORTER, DOMAIN, METRICS_URL
+from .coordinator import ApexDataUpdateCoordinator
+from .metrics import RollingStatistic
+
+# Names, types, and help of the metric families, in the order they are rendered
+_FAMILIES = {
+    "neptune_apex_up": ("gauge", "Whether the last poll of the Apex succeeded."),
+    "neptune_apex_probe_value": ("gauge", "Latest reading of a probe."),
+    "neptune_apex_outlet_on": ("gauge", "Whether an outlet is on."),
+    "neptune_apex_poll_interval_seconds": ("gauge", "Current time between polls."),
+    "neptune_apex_status_fetch_seconds": (
+        "gauge",
+        "Time spent downloading the status over recent polls.",
+    ),
+    "neptune_apex_update_seconds": (
+        "gauge",
+        "Time spent on each coordinator update over recent polls.",
+    ),
+    "neptune_apex_breaker_open": (
+        "gauge",
+        "Whether the circuit breaker is holding requests back.",
+    ),
+    "neptune_apex_breaker_failures": ("gauge", "Requests which failed in a row."),
+    "neptune_apex_skipped_writes_total": (
+        "counter",
+        "Entity state writes skipped because nothing changed.",
+    ),
+    "neptune_apex_shared_refreshes_total": (
+        "counter",
+        "Refreshes answered with a download already made.",
+    ),
+    "neptune_apex_snapshot_timestamp_seconds": (
+        "gauge",
+        "When the readings served were taken from the coordinator.",
+    ),
+}
+
+
+class ApexSnapshot:
+    """The readings and poll health of one Apex, rendered for the endpoint."""
+
+    def __init__(
+        self, serial_number: str, coordinator: ApexDataUpdateCoordinator
+    ) -> None:
+        """Render the coordinator's latest data."""
+        conn = coordinator.conn
+        readings = conn.readings
+        status = coordinator.data
+        labels = {"serial_number": serial_number, "name": coordinator.name}
+        # Sample lines of each metric family, and the same data for JSON
+        self.samples: dict[str, list[str]] = {family: [] for family in _FAMILIES}
+        self.data: dict[str, Any] = {
+            **labels,
+            "up": coordinator.last_update_success,
+            "poll_interval": coordinator.update_interval.total_seconds(),
+            "probes": {},
+            "outlets": {},
+            "breaker": conn.breaker.as_dict(),
+            "metrics": {
+                "status_fetch_ms": conn.fetch_time.as_dict(),
+                "update_ms": coordinator.update_time.as_dict(),
+                "skipped_writes": coordinator.skipped_writes,
+                "shared_refreshes": conn.shared_refreshes,
+            },
+            "timestamp": time(),
+        }
+
+        self._add("neptune_apex_up", labels, int(coordinator.last_update_success))
+        if status is not None:
+            for key, value in status.probes.items():
+                if (probe_type := readings.probe_types.get(key)) is None:
+                    continue
+                name = key[: -len(probe_type) - 1]
+                self.data["probes"][key] = {
+                    "name": name,
+                    "type": probe_type,
+                    "value": value,
+                }
+                try:
+                    reading = float(value)
+                except ValueError:
+                    continue
+                self._add(
+                    "neptune_apex_probe_value",
+                    {**labels, "probe": name, "type": probe_type},
+                    reading,
+                )
+            for device_id, state in status.outlets.items():
+                name = readings.outlet_names.get(device_id, device_id)
+                self.data["outlets"][device_id] = {"name": name, "state": state}
+                self._add(
+                    "neptune_apex_outlet_on",
+                    {**labels, "outlet": name, "device_id": device_id},
+                    int(state.endswith("ON")),
+                )
+
+        self._add(
+            "neptune_apex_poll_interval_seconds",
+            labels,
+            coordinator.update_interval.total_seconds(),
+        )
+        self._add_percentiles(
+            "neptune_apex_status_fetch_seconds", labels, conn.fetch_time
+        )
+        self._add_percentiles(
+            "neptune_apex_update_seconds", labels, coordinator.update_time
+        )
+        self._add(
+            "neptune_apex_breaker_open",
+            labels,
+            int(conn.breaker.state != BreakerState.CLOSED),
+        )
+        self._add("neptune_apex_breaker_failures", labels, conn.breaker.failures)
+        self._add(
+            "neptune_apex_skipped_writes_total", labels, coordinator.skipped_writes
+        )
+        self._add("neptune_apex_shared_refreshes_total", labels, conn.shared_refreshes)
+        self._add(
+            "neptune_apex_snapshot_timestamp_seconds", labels, self.data["timestamp"]
+        )
+
+    def _add(self, family: str, labels: dict[str, str], value: float) -> None:
+        """Add a sample to a metric family."""
+        rendered = ",".join(
+            f'{label}="{_escape(str(text))}"' for label, text in labels.items()
+        )
+        self.samples[family].append(f"{family}{{{rendered}}} {value}")
+
+    def _add_percentiles(
+        self, family: str, labels: dict[str, str], statistic: RollingStatistic
+    ) -> None:
+        """Add the median and 95th percentile of milliseconds measured, in seconds."""
+        for quantile, percent in (("0.5", 50), ("0.95", 95)):
+            if (value := statistic.percentile(percent)) is not None:
+                self._add(family, {**labels, "quantile": quantile}, value / 1000)
+
+
+def _escape(text: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class ApexMetricsExporter:
+    """Serve snapshots of every Apex's coordinator data, rendered once per poll.
+
+    Snapshots are only rendered when the endpoint is requested, and only for Apexes
+    which were polled since their last snapshot, so scrapes between polls are served
+    the same response and never cause requests to an Apex.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an exporter with no Apexes."""
+        # Coordinators and their latest snapshot, or None once they've updated since
+        self._coordinators: dict[str, ApexDataUpdateCoordinator] = {}
+        self._snapshots: dict[str, ApexSnapshot | None] = {}
+        # Responses rendered from the current snapshots
+        self._text: bytes | None = None
+        self._json: bytes | None = None
+
+    @callback
+    def async_track(
+        self, serial_number: str, coordinator: ApexDataUpdateCoordinator
+    ) -> CALLBACK_TYPE:
+        """Serve an Apex's coordinator data until the returned callback is called."""
+
+        @callback
+        def _async_invalidate() -> None:
+            """Render the Apex again for the next request."""
+            self._snapshots[serial_number] = None
+            self._text = self._json = None
+
+        self._coordinators[serial_number] = coordinator
+        _async_invalidate()
+        remove_listener = coordinator.async_add_listener(_async_invalidate)
+
+        @callback
+        def _async_untrack() -> None:
+            """Stop serving the Apex."""
+            remove_listener()
+            del self._coordinators[serial_number]
+            del self._snapshots[serial_number]
+            self._text = self._json = None
+
+        return _async_untrack
+
+    def text(self) -> bytes:
+        """Return every Apex in the Prometheus text format."""
+        if self._text is None:
+            snapshots = self._current_snapshots()
+            lines = []
+            for family, (metric_type, description) in _FAMILIES.items():
+                lines.append(f"# HELP {family} {description}")
+                lines.append(f"# TYPE {family} {metric_type}")
+                for snapshot in snapshots:
+                    lines.extend(snapshot.samples[family])
+            self._text = ("\n".join(lines) + "\n").encode()
+        return self._text
+
+    def json(self) -> bytes:
+        """Return every Apex as JSON."""
+        if self._json is None:
+            self._json = json_bytes(
+                [snapshot.data for snapshot in self._current_snapshots()]
+            )
+        return self._json
+
+    def _current_snapshots(self) -> list[ApexSnapshot]:
+        """Render the Apexes which updated since their last snapshot."""
+        for serial_number, snapshot in self._snapshots.items():
+            if snapshot is None:
+                self._snapshots[serial_number] = ApexSnapshot(
+                    serial_number, self._coordinators[serial_number]
+                )
+        return list(self._snapshots.values())
+
+
+class ApexMetricsView(HomeAssistantView):
+    """Serve the metrics of every Apex, as JSON with ?format=json."""
+
+    url = METRICS_URL
+    name = f"api:{DOMAIN}:metrics"
+
+    def __init__(self, exporter: ApexMetricsExporter) -> None:
+        """Initialize the view."""
+        self._exporter = exporter
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Return the metrics."""
+        if request.query.get("format") == "json":
+            return web.Response(
+                body=self._exporter.json(), content_type=CONTENT_TYPE_JSON
+            )
+        return web.Response(
+            body=self._exporter.text(),
+            content_type=CONTENT_TYPE_TEXT_PLAIN,
+            charset="utf-8",
+        )
+
+
+@callback
+def async_get_exporter(hass: HomeAssistant) -> ApexMetricsExporter:
+    """Get the exporter shared by every Apex entry, serving it if HTTP is set up."""
+    if DATA_EXPORTER not in hass.data:
+        exporter = ApexMetricsExporter()
+        hass.data[DATA_EXPORTER] = exporter
+        if "http" in hass.config.components:
+            hass.http.register_view(ApexMetricsView(exporter))
+    return hass.data[DATA_EXPORTER]
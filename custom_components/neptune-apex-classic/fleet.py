@@ -0,0 +1,66 @@
+"""Polling shared by every Apex configured on this Home Assistant."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DATA_FLEET, DEFAULT_MAX_CONCURRENT_FETCHES, TIME_BETWEEN_UPDATES
+
+
+class ApexFleet:
+    """Spread the polls of every Apex across the poll interval instead of polling in lockstep.
+
+    Each poll is moved to the first slot at least TIME_BETWEEN_UPDATES divided by the
+    number of Apexes away from every other scheduled poll, and only a few status
+    downloads may run at the same time.
+    """
+
+    def __init__(self, max_fetches: int) -> None:
+        """Initialize the fleet."""
+        self.fetches = asyncio.Semaphore(max_fetches)
+        # Time each member's next poll is scheduled for, keyed by its coordinator
+        self._slots: dict[object, datetime] = {}
+
+    @property
+    def size(self) -> int:
+        """Return the number of Apexes polled by the fleet."""
+        return len(self._slots)
+
+    def next_poll(self, member: object) -> datetime | None:
+        """Get the time a member's next poll is scheduled for."""
+        return self._slots.get(member)
+
+    @callback
+    def async_stagger(
+        self, member: object, due: datetime, interval: timedelta
+    ) -> timedelta:
+        """Schedule a member's poll and return how much later than `due` it should run.
+
+        Polls are not held back by more than their own interval, so that an Apex
+        polling quickly after a change stays responsive.
+        """
+        self._slots.pop(member, None)
+        spacing = TIME_BETWEEN_UPDATES / (len(self._slots) + 1)
+        slot = due
+        for other in sorted(self._slots.values()):
+            if abs(slot - other) < spacing:
+                slot = other + spacing
+        if slot - due > interval:
+            slot = due
+        self._slots[member] = slot
+        return slot - due
+
+    @callback
+    def async_remove(self, member: object) -> None:
+        """Stop scheduling polls for a member."""
+        self._slots.pop(member, None)
+
+
+@callback
+def async_get_fleet(hass: HomeAssistant) -> ApexFleet:
+    """Get the fleet shared by every Apex entry."""
+    if DATA_FLEET not in hass.data:
+        hass.data[DATA_FLEET] = ApexFleet(DEFAULT_MAX_CONCURRENT_FETCHES)
+    return hass.data[DATA_FLEET]
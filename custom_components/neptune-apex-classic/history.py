@@ -0,0 +1,108 @@
+"""Recent probe readings kept in fixed memory, downsampled to min/mean/max per period."""
+from __future__ import annotations
+
+from array import array
+from typing import Any
+
+
+def trend_key(key: str) -> str:
+    """Return the key used to track the aggregates of the probe with a probe_key()."""
+    return f"{key}-trend"
+
+
+class ProbeHistory:
+    """Ring buffers of one probe's raw readings and of its aggregates over each period.
+
+    Raw readings are kept for the last `raw_size` polls. Every reading also goes into
+    the aggregate of the period it falls in, and each finished period's minimum, mean,
+    and maximum are kept for the last `period_count` periods. Periods start on whole
+    multiples of their length, so every probe's periods line up.
+    """
+
+    def __init__(self, raw_size: int, period_count: int, period: float) -> None:
+        """Initialize empty buffers; `period` is in seconds."""
+        self.period = period
+        self._raw_times = array("d", bytes(8 * raw_size))
+        self._raw_values = array("d", bytes(8 * raw_size))
+        self._raw_next = 0
+        self._raw_count = 0
+        self._starts = array("d", bytes(8 * period_count))
+        self._mins = array("d", bytes(8 * period_count))
+        self._means = array("d", bytes(8 * period_count))
+        self._maxes = array("d", bytes(8 * period_count))
+        self._period_next = 0
+        self._period_count = 0
+        # Aggregate of the period in progress
+        self._start: float | None = None
+        self._min = 0.0
+        self._max = 0.0
+        self._sum = 0.0
+        self._count = 0
+
+    def record(self, timestamp: float, value: float) -> bool:
+        """Add a reading and return whether it finished a period."""
+        self._raw_times[self._raw_next] = timestamp
+        self._raw_values[self._raw_next] = value
+        self._raw_next = (self._raw_next + 1) % len(self._raw_times)
+        self._raw_count = min(self._raw_count + 1, len(self._raw_times))
+
+        start = timestamp - timestamp % self.period
+        finished = self._start is not None and start != self._start
+        if finished:
+            self._finish_period()
+        if self._start is None:
+            self._start = start
+            self._min = self._max = value
+            self._sum = 0.0
+            self._count = 0
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+        self._sum += value
+        self._count += 1
+        return finished
+
+    def latest(self) -> dict[str, Any] | None:
+        """Return the aggregate of the last finished period."""
+        if not self._period_count:
+            return None
+        return self._aggregate((self._period_next - 1) % len(self._starts))
+
+    def aggregates(self) -> list[dict[str, Any]]:
+        """Return the aggregates of the finished periods, oldest first."""
+        first = self._period_next - self._period_count
+        return [
+            self._aggregate((first + offset) % len(self._starts))
+            for offset in range(self._period_count)
+        ]
+
+    def samples(self) -> list[tuple[float, float]]:
+        """Return the raw readings as timestamps and values, oldest first."""
+        first = self._raw_next - self._raw_count
+        size = len(self._raw_times)
+        return [
+            (
+                self._raw_times[(first + offset) % size],
+                self._raw_values[(first + offset) % size],
+            )
+            for offset in range(self._raw_count)
+        ]
+
+    def _finish_period(self) -> None:
+        """Move the period in progress into the aggregates."""
+        index = self._period_next
+        self._starts[index] = self._start
+        self._mins[index] = self._min
+        self._means[index] = self._sum / self._count
+        self._maxes[index] = self._max
+        self._period_next = (index + 1) % len(self._starts)
+        self._period_count = min(self._period_count + 1, len(self._starts))
+        self._start = None
+
+    def _aggregate(self, index: int) -> dict[str, Any]:
+        """Return the aggregate stored at an index of the buffers."""
+        return {
+            "start": self._starts[index],
+            "min": self._mins[index],
+            "mean": self._means[index],
+            "max": self._maxes[index],
+        }
@@ -0,0 +1,110 @@
+"""Inventory of the probes and outlets connected to an Apex."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from bs4 import BeautifulSoup
+from neptune_apex_classic.connection import ApexConnection
+from neptune_apex_classic.outlet import Outlet, get_connected_outlets
+from neptune_apex_classic.probe import Probe, get_connected_probes
+
+from .parser import probe_key
+
+
+@dataclass
+class ApexInventoryChange:
+    """Probes and outlets which appeared in or disappeared from an Apex's status."""
+
+    probes: list[Probe] = field(default_factory=list)
+    outlets: list[Outlet] = field(default_factory=list)
+    # Keys of the probes and outlets which went away, as tracked by the coordinator
+    removed: list[str] = field(default_factory=list)
+
+
+class ApexInventory:
+    """Probes and outlets found in an Apex's status, shared by all entity platforms."""
+
+    def __init__(
+        self,
+        probes: list[Probe],
+        outlets: list[Outlet],
+        status: BeautifulSoup | None = None,
+        excluded: frozenset[str] = frozenset(),
+    ) -> None:
+        """Initialize the inventory."""
+        self.probes = probes
+        self.outlets = outlets
+        # Status the inventory was built from, and the probe keys and outlet device
+        # IDs left out of it
+        self._status = status
+        self.excluded = excluded
+
+    @classmethod
+    def from_connection(
+        cls, conn: ApexConnection, excluded: frozenset[str] = frozenset()
+    ) -> ApexInventory:
+        """Build the inventory from the status cached by a connection, less excluded items."""
+        return cls(
+            [
+                probe
+                for probe in get_connected_probes(conn)
+                if probe_key(probe.name, probe.type) not in excluded
+            ],
+            [
+                outlet
+                for outlet in get_connected_outlets(conn)
+                if outlet.device_id not in excluded
+            ],
+            conn.get_status(),
+            excluded,
+        )
+
+    def update_from_connection(
+        self, conn: ApexConnection
+    ) -> ApexInventoryChange | None:
+        """Catch up with the status cached by a connection and return what changed.
+
+        Connections only parse a new status into soup when probes or outlets came or
+        went, so this returns None straight away after an ordinary poll.
+        """
+        if conn.get_status() is self._status:
+            return None
+        latest = ApexInventory.from_connection(conn, self.excluded)
+        self._status = latest._status
+
+        probes = {probe_key(probe.name, probe.type): probe for probe in self.probes}
+        latest_probes = {
+            probe_key(probe.name, probe.type): probe for probe in latest.probes
+        }
+        # Outlets are identified by name too, since a renamed outlet is sent commands
+        # under its new name
+        outlets = {_outlet_identity(outlet): outlet for outlet in self.outlets}
+        latest_outlets = {_outlet_identity(outlet): outlet for outlet in latest.outlets}
+
+        change = ApexInventoryChange(
+            probes=[probe for key, probe in latest_probes.items() if key not in probes],
+            outlets=[
+                outlet for key, outlet in latest_outlets.items() if key not in outlets
+            ],
+            removed=[key for key in probes if key not in latest_probes]
+            + [
+                outlet.device_id
+                for key, outlet in outlets.items()
+                if key not in latest_outlets
+            ],
+        )
+        if not (change.probes or change.outlets or change.removed):
+            return None
+
+        # Keep the objects of probes and outlets which are still there, since their
+        # entities hold on to them
+        self.probes = [probes.get(key, probe) for key, probe in latest_probes.items()]
+        self.outlets = [
+            outlets.get(key, outlet) for key, outlet in latest_outlets.items()
+        ]
+        return change
+
+
+def _outlet_identity(outlet: Outlet) -> str:
+    """Return the name and device ID which together identify an outlet."""
+    return f"{outlet.name}-{outlet.device_id}"
@@ -0,0 +1,386 @@
+"""Import of the datalog and outlet log kept by an Apex into long-term statistics."""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone, tzinfo
+import logging
+from typing import Any
+from xml.etree.ElementTree import Element
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    async_import_statistics,
+    statistics_during_period,
+)
+from homeassistant.components.sensor import ATTR_STATE_CLASS
+from homeassistant.const import (
+    ATTR_UNIT_OF_MEASUREMENT,
+    PERCENTAGE,
+    UnitOfElectricCurrent,
+    UnitOfElectricPotential,
+    UnitOfTemperature,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+from homeassistant.util.unit_conversion import TemperatureConverter
+
+from .connection import ManagedApexConnection
+from .const import DOMAIN, LOG_IMPORT_DAYS, STORAGE_VERSION
+from .parser import probe_key
+
+_LOGGER = logging.getLogger(__name__)
+
+# Format of the timestamps in the logs, in the Apex's time zone
+_LOG_DATE_FORMAT = "%m/%d/%Y %H:%M:%S"
+
+_PROBE_UNITS = {
+    "Temp": UnitOfTemperature.FAHRENHEIT,
+    "ORP": UnitOfElectricPotential.MILLIVOLT,
+    "Amps": UnitOfElectricCurrent.AMPERE,
+}
+
+_OUTLET_ON_STATES = frozenset(["ON", "AON"])
+
+_HOUR = timedelta(hours=1)
+
+
+class ApexLogImporter:
+    """Fill gaps in the statistics of an Apex's probes and outlets from its own logs.
+
+    The Apex logs probe values every few minutes and every outlet state change. The
+    logs are downloaded one day at a time and folded into hourly statistics: the
+    minimum, mean, and maximum of each probe, and the percentage of each hour each
+    outlet was on. Probe statistics fill the hours before the probe's sensor was set up
+    which its own statistics are missing. Probes whose sensor keeps no statistics, and
+    outlets, whose binary sensors keep none, get statistics of their own. Only whole
+    hours are imported, and the end of the last one is saved as a cursor along with
+    the outlet states at that moment, so the next import starts where this one
+    stopped and never downloads a day it has finished.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        conn: ManagedApexConnection,
+        name: str,
+        serial_number: str,
+    ) -> None:
+        """Initialize the importer for an Apex."""
+        self._hass = hass
+        self._conn = conn
+        self._name = name
+        self._serial_number = serial_number
+        self._serial = slugify(serial_number)
+        self._store = _cursor_store(hass, serial_number)
+        # Hours from this one on are recorded by the sensors themselves
+        self._recording_since = _hour_of(dt_util.utcnow())
+        # Time zone of the log timestamps, as reported by the Apex
+        self._timezone: tzinfo = dt_util.DEFAULT_TIME_ZONE
+
+    async def async_import(self) -> None:
+        """Import every whole hour logged since the cursor."""
+        saved = await self._store.async_load() or {}
+        end = _hour_of(dt_util.utcnow())
+        cursor = end - timedelta(days=LOG_IMPORT_DAYS)
+        if (saved_cursor := saved.get("cursor")) is not None:
+            cursor = max(cursor, dt_util.parse_datetime(saved_cursor))
+        outlet_states: dict[str, bool] = saved.get("outlets", {})
+
+        day = cursor.astimezone(self._timezone).date()
+        imported = 0
+        while cursor < end:
+            datalog = await self._conn.async_get_log("datalog", day)
+            outlog = await self._conn.async_get_log("outlog", day)
+            if datalog is None or outlog is None:
+                _LOGGER.warning(
+                    "Could not download the logs of %s for %s, will retry on next start",
+                    self._name,
+                    day,
+                )
+                break
+            self._read_timezone(datalog)
+
+            # Import up to the end of the day in the Apex's time zone, or up to the
+            # last whole hour if the day isn't over
+            page_end = min(
+                datetime.combine(day, time(), self._timezone) + timedelta(days=1), end
+            )
+            page_end = _hour_of(page_end)
+            if page_end > cursor:
+                imported += await self._async_import_datalog(datalog, cursor, page_end)
+                imported += self._import_outlog(outlog, cursor, page_end, outlet_states)
+                cursor = page_end
+                await self._store.async_save(
+                    {"cursor": cursor.isoformat(), "outlets": outlet_states}
+                )
+            day += timedelta(days=1)
+
+        _LOGGER.info(
+            "Imported %s hours of statistics from the logs of %s", imported, self._name
+        )
+
+    def _read_timezone(self, log: Element) -> None:
+        """Take the Apex's time zone from a log, given as an offset in hours."""
+        if (offset := log.findtext("timezone")) is None:
+            return
+        try:
+            self._timezone = timezone(timedelta(hours=float(offset)))
+        except ValueError:
+            pass
+
+    def _records(
+        self, log: Element, start: datetime, end: datetime
+    ) -> list[tuple[datetime, Element]]:
+        """Return the timestamped records of a log from start to end, oldest first."""
+        records = []
+        for record in log.iter("record"):
+            try:
+                timestamp = datetime.strptime(
+                    record.findtext("date", ""), _LOG_DATE_FORMAT
+                ).replace(tzinfo=self._timezone)
+            except ValueError:
+                continue
+            if start <= timestamp < end:
+                records.append((timestamp, record))
+        records.sort(key=lambda record: record[0])
+        return records
+
+    async def _async_import_datalog(
+        self, log: Element, start: datetime, end: datetime
+    ) -> int:
+        """Import hourly probe statistics from a datalog and return how many."""
+        # The datalog leaves out probe types, so look them up from the status
+        types = {
+            key[: -len(probe_type) - 1]: probe_type
+            for key, probe_type in self._conn.readings.probe_types.items()
+        }
+        hours: dict[tuple[str, str], dict[datetime, list[float]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        seen = set[datetime]()
+        for timestamp, record in self._records(log, start, end):
+            # The Apex can log the same moment twice around clock changes
+            if timestamp in seen:
+                continue
+            seen.add(timestamp)
+            hour = _hour_of(timestamp)
+            for probe in record.iter("probe"):
+                name = probe.findtext("name")
+                probe_type = probe.findtext("type") or types.get(name)
+                try:
+                    value = float(probe.findtext("value", ""))
+                except ValueError:
+                    continue
+                if name is not None and probe_type is not None:
+                    hours[(name, probe_type)][hour].append(value)
+
+        # Sensors keeping statistics of the probes, and the hours they already have
+        entity_ids = {
+            probe: entity_id
+            for probe in hours
+            if (entity_id := self._statistics_entity_id(probe_key(*probe)))
+        }
+        recorded = await self._async_recorded_hours(
+            set(entity_ids.values()), start, end
+        )
+
+        imported = 0
+        for (name, probe_type), values in hours.items():
+            if (entity_id := entity_ids.get((name, probe_type))) is None:
+                statistics = _hourly_statistics(values)
+                self._add_statistics(
+                    probe_key(name, probe_type),
+                    f"{self._name} {name}",
+                    _PROBE_UNITS.get(probe_type),
+                    statistics,
+                )
+            else:
+                recorded_hours = recorded.get(entity_id, set())
+                statistics = self._import_entity_statistics(
+                    entity_id,
+                    _PROBE_UNITS.get(probe_type),
+                    {
+                        hour: samples
+                        for hour, samples in values.items()
+                        if hour < self._recording_since and hour not in recorded_hours
+                    },
+                )
+            imported += len(statistics)
+        return imported
+
+    def _statistics_entity_id(self, key: str) -> str | None:
+        """Return the sensor of a probe if it keeps long-term statistics."""
+        entity_id = er.async_get(self._hass).async_get_entity_id(
+            "sensor", DOMAIN, f"{self._serial_number}/{key}"
+        )
+        if entity_id is None or (state := self._hass.states.get(entity_id)) is None:
+            return None
+        return entity_id if state.attributes.get(ATTR_STATE_CLASS) else None
+
+    async def _async_recorded_hours(
+        self, entity_ids: set[str], start: datetime, end: datetime
+    ) -> dict[str, set[datetime]]:
+        """Return the hours from start to end each sensor already has statistics for."""
+        if not entity_ids:
+            return {}
+        rows = await get_instance(self._hass).async_add_executor_job(
+            statistics_during_period,
+            self._hass,
+            start,
+            end,
+            entity_ids,
+            "hour",
+            None,
+            {"mean"},
+        )
+        return {
+            entity_id: {_row_start(row["start"]) for row in entity_rows}
+            for entity_id, entity_rows in rows.items()
+        }
+
+    def _import_entity_statistics(
+        self,
+        entity_id: str,
+        log_unit: str | None,
+        values: dict[datetime, list[float]],
+    ) -> list[StatisticData]:
+        """Fill hours missing from a sensor's statistics, in the unit it shows."""
+        unit = self._hass.states.get(entity_id).attributes.get(ATTR_UNIT_OF_MEASUREMENT)
+        if (
+            log_unit != unit
+            and log_unit in TemperatureConverter.VALID_UNITS
+            and unit in TemperatureConverter.VALID_UNITS
+        ):
+            values = {
+                hour: [
+                    TemperatureConverter.convert(value, log_unit, unit)
+                    for value in samples
+                ]
+                for hour, samples in values.items()
+            }
+        statistics = _hourly_statistics(values)
+        if statistics:
+            metadata = StatisticMetaData(
+                has_mean=True,
+                has_sum=False,
+                name=None,
+                source="recorder",
+                statistic_id=entity_id,
+                unit_of_measurement=unit,
+            )
+            async_import_statistics(self._hass, metadata, statistics)
+        return statistics
+
+    def _import_outlog(
+        self,
+        log: Element,
+        start: datetime,
+        end: datetime,
+        outlet_states: dict[str, bool],
+    ) -> int:
+        """Import the hourly on time of each outlet from an outlet log and return how many.
+
+        outlet_states holds whether each outlet was on at start, and is updated to the
+        states at end. Hours in which an outlet's state isn't known throughout are
+        skipped.
+        """
+        changes: dict[str, list[tuple[datetime, bool]]] = defaultdict(list)
+        seen = set[tuple[datetime, str]]()
+        for timestamp, record in self._records(log, start, end):
+            name = record.findtext("name")
+            state = record.findtext("value")
+            if name is None or state is None or (timestamp, name) in seen:
+                continue
+            seen.add((timestamp, name))
+            changes[name].append((timestamp, state in _OUTLET_ON_STATES))
+
+        imported = 0
+        for name in changes.keys() | outlet_states.keys():
+            # Seconds on and seconds of known state in each hour
+            hours: dict[datetime, list[float]] = defaultdict(lambda: [0.0, 0.0])
+            since, state = start, outlet_states.get(name)
+            for until, next_state in [*changes.get(name, []), (end, None)]:
+                while state is not None and since < until:
+                    hour = _hour_of(since)
+                    span = (min(until, hour + _HOUR) - since).total_seconds()
+                    hours[hour][1] += span
+                    if state:
+                        hours[hour][0] += span
+                    since = min(until, hour + _HOUR)
+                since, state = until, next_state if until < end else state
+            if state is not None:
+                outlet_states[name] = state
+
+            statistics = [
+                StatisticData(
+                    start=hour,
+                    mean=100 * on / known,
+                    min=100 if on >= known else 0,
+                    max=100 if on else 0,
+                )
+                for hour, (on, known) in sorted(hours.items())
+                if known >= _HOUR.total_seconds()
+            ]
+            if statistics:
+                self._add_statistics(
+                    f"{name}-on", f"{self._name} {name} on time", PERCENTAGE, statistics
+                )
+                imported += len(statistics)
+        return imported
+
+    def _add_statistics(
+        self,
+        key: str,
+        name: str,
+        unit: str | None,
+        statistics: list[StatisticData],
+    ) -> None:
+        """Write hourly statistics for one probe or outlet."""
+        metadata = StatisticMetaData(
+            has_mean=True,
+            has_sum=False,
+            name=name,
+            source=DOMAIN,
+            statistic_id=f"{DOMAIN}:{self._serial}_{slugify(key)}",
+            unit_of_measurement=unit,
+        )
+        async_add_external_statistics(self._hass, metadata, statistics)
+
+
+def _hourly_statistics(values: dict[datetime, list[float]]) -> list[StatisticData]:
+    """Return the minimum, mean, and maximum of each hour's samples."""
+    return [
+        StatisticData(
+            start=hour,
+            mean=sum(samples) / len(samples),
+            min=min(samples),
+            max=max(samples),
+        )
+        for hour, samples in sorted(values.items())
+    ]
+
+
+def _row_start(start: float | datetime) -> datetime:
+    """Return the start of a statistics row, which the recorder gives as a timestamp."""
+    return start if isinstance(start, datetime) else dt_util.utc_from_timestamp(start)
+
+
+def _hour_of(timestamp: datetime) -> datetime:
+    """Return the start of the UTC hour holding a timestamp."""
+    return dt_util.as_utc(timestamp).replace(minute=0, second=0, microsecond=0)
+
+
+async def async_remove_log_cursor(hass: HomeAssistant, serial_number: str) -> None:
+    """Forget how far the logs of an Apex have been imported."""
+    await _cursor_store(hass, serial_number).async_remove()
+
+
+def _cursor_store(hass: HomeAssistant, serial_number: str) -> Store[dict[str, Any]]:
+    """Return the storage of an Apex's log import cursor."""
+    return Store[dict[str, Any]](
+        hass, STORAGE_VERSION, f"{DOMAIN}.{slugify(serial_number)}.logs"
+    )
@@ -0,0 +1,40 @@
+"""Rolling measurements of how an Apex and its entities are performing."""
+from __future__ import annotations
+
+from collections import deque
+from typing import Any
+
+from .const import METRICS_WINDOW
+
+
+class RollingStatistic:
+    """The most recent samples of a measurement, summarized as percentiles."""
+
+    def __init__(self, size: int = METRICS_WINDOW) -> None:
+        """Initialize an empty window of samples."""
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def record(self, value: float) -> None:
+        """Add a sample, dropping the oldest one if the window is full."""
+        self._samples.append(value)
+
+    @property
+    def last(self) -> float | None:
+        """Return the most recent sample."""
+        return self._samples[-1] if self._samples else None
+
+    def percentile(self, percent: float) -> float | None:
+        """Return the sample below which `percent` percent of the window falls."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[round(percent / 100 * (len(ordered) - 1))]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Summarize the window for diagnostics."""
+        return {
+            "last": self.last,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "samples": len(self._samples),
+        }
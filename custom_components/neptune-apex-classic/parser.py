@@ -0,0 +1,134 @@
+"""Incremental parsing of the status document served by an Apex."""
+from __future__ import annotations
+
+from xml.etree.ElementTree import Element, XMLPullParser
+
+# Elements holding the fields of a probe or outlet, read when their parent ends
+_FIELD_TAGS = frozenset(["name", "type", "value", "outputID", "state", "deviceID"])
+
+
+def probe_key(name: str, probe_type: str) -> str:
+    """Return the key used to track the value of a probe."""
+    return f"{name}-{probe_type}"
+
+
+class ApexReadings:
+    """Probe values and outlet states from the latest status document, updated in place."""
+
+    def __init__(self) -> None:
+        """Initialize empty readings."""
+        self.serial: str | None = None
+        # Probe values and types keyed by probe_key(), outlet states keyed by device ID
+        self.probes: dict[str, str] = {}
+        self.probe_types: dict[str, str] = {}
+        self.outlets: dict[str, str] = {}
+        # Outlet names keyed by device ID
+        self.outlet_names: dict[str, str] = {}
+        # Whether the latest document added, removed, or renamed probes or outlets
+        self.inventory_changed = False
+        # Probe keys and outlet device IDs which are never read, and those which are
+        # only read again when `slow_due` is set
+        self.excluded = frozenset[str]()
+        self.slow = frozenset[str]()
+        self.slow_due = True
+
+
+class StatusParser:
+    """Parse a status document as it downloads, applying its readings to ApexReadings.
+
+    Elements are discarded as soon as they have been read, and only the serial number,
+    probes, and outlets are read, so the whole document is never held as a tree.
+    Readings are only applied once the whole document has been parsed, so a download
+    which fails partway leaves the previous readings as they were. Excluded probes and
+    outlets are skipped as if the Apex didn't report them, and those on the slow tier
+    keep their previous reading unless the slow tier is due.
+    """
+
+    def __init__(self, readings: ApexReadings) -> None:
+        """Initialize the parser for one document."""
+        self._readings = readings
+        self._parser = XMLPullParser(events=("end",))
+        # Readings of this document: the serial number, probe types and values keyed
+        # by probe_key(), and outlet states and names keyed by device ID
+        self._serial = readings.serial
+        self._probes: dict[str, tuple[str, str]] = {}
+        self._outlets: dict[str, tuple[str, str | None]] = {}
+
+    def feed(self, data: bytes | str) -> None:
+        """Parse the next piece of the document."""
+        self._parser.feed(data)
+        self._read_events()
+
+    def close(self) -> None:
+        """Finish the document and apply its readings, including which went away."""
+        self._parser.close()
+        self._read_events()
+
+        readings = self._readings
+        readings.serial = self._serial
+        keep_slow = not readings.slow_due
+        changed = False
+        for key, (probe_type, value) in self._probes.items():
+            if key not in readings.probes:
+                readings.probe_types[key] = probe_type
+                changed = True
+            elif keep_slow and key in readings.slow:
+                continue
+            readings.probes[key] = value
+        if len(self._probes) != len(readings.probes):
+            for key in readings.probes.keys() - self._probes.keys():
+                del readings.probes[key]
+                del readings.probe_types[key]
+            changed = True
+
+        for device_id, (state, name) in self._outlets.items():
+            if device_id not in readings.outlets:
+                changed = True
+            elif keep_slow and device_id in readings.slow:
+                continue
+            readings.outlets[device_id] = state
+            if name is not None:
+                # Renamed outlets are sent commands under their new name
+                if readings.outlet_names.get(device_id, name) != name:
+                    changed = True
+                readings.outlet_names[device_id] = name
+        if len(self._outlets) != len(readings.outlets):
+            for key in readings.outlets.keys() - self._outlets.keys():
+                del readings.outlets[key]
+                readings.outlet_names.pop(key, None)
+            changed = True
+        readings.inventory_changed = changed
+
+    def _read_events(self) -> None:
+        """Read the probes, outlets, and serial number from elements parsed so far."""
+        for _, element in self._parser.read_events():
+            tag = element.tag
+            if tag == "probe":
+                self._read_probe(element)
+            elif tag == "outlet":
+                self._read_outlet(element)
+            elif tag == "serial":
+                self._serial = element.text
+            elif tag in _FIELD_TAGS:
+                continue
+            element.clear()
+
+    def _read_probe(self, element: Element) -> None:
+        """Read the value of one probe."""
+        name = element.findtext("name")
+        probe_type = element.findtext("type")
+        value = element.findtext("value")
+        if name is None or probe_type is None or value is None:
+            return
+        key = probe_key(name, probe_type)
+        if key not in self._readings.excluded:
+            self._probes[key] = (probe_type, value)
+
+    def _read_outlet(self, element: Element) -> None:
+        """Read the state and name of one outlet."""
+        device_id = element.findtext("deviceID")
+        state = element.findtext("state")
+        if device_id is None or state is None:
+            return
+        if device_id not in self._readings.excluded:
+            self._outlets[device_id] = (state, element.findtext("name"))
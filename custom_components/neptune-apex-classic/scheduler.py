@@ -0,0 +1,66 @@
+"""Adaptive scheduling of Apex status polls."""
+from __future__ import annotations
+
+from datetime import timedelta
+from time import monotonic
+
+from .const import (
+    FAST_POLL_DURATION,
+    POLL_BACKOFF_FACTOR,
+    SLOW_RESPONSE_THRESHOLD,
+    TIME_BETWEEN_UPDATES,
+)
+
+
+class AdaptivePollScheduler:
+    """Pick the time until the next poll from how lively and how responsive the Apex is.
+
+    The scheduler polls at the minimum interval for a while after an outlet changes
+    or a probe moves quickly, returns to the default interval when values change at
+    a normal pace, and backs off towards the maximum interval while readings are
+    steady or the Apex is slow to answer.
+    """
+
+    def __init__(self, min_interval: timedelta, max_interval: timedelta) -> None:
+        """Initialize the scheduler with the bounds configured for an entry."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = self._clamp(TIME_BETWEEN_UPDATES)
+        self._fast_until = 0.0
+
+    def set_bounds(self, min_interval: timedelta, max_interval: timedelta) -> None:
+        """Change the bounds the interval may move between."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = self._clamp(self.interval)
+
+    def boost(self) -> None:
+        """Poll at the minimum interval for a while, e.g. after an outlet was commanded."""
+        self._fast_until = monotonic() + FAST_POLL_DURATION.total_seconds()
+        self.interval = self.min_interval
+
+    def next_interval(
+        self, changed: bool, urgent: bool, response_time: float
+    ) -> timedelta:
+        """Return the interval until the next poll after a successful update."""
+        if urgent:
+            self.boost()
+        elif response_time > SLOW_RESPONSE_THRESHOLD.total_seconds():
+            self.interval = self._clamp(self.interval * POLL_BACKOFF_FACTOR)
+        elif monotonic() < self._fast_until:
+            self.interval = self.min_interval
+        elif changed:
+            self.interval = self._clamp(TIME_BETWEEN_UPDATES)
+        else:
+            self.interval = self._clamp(self.interval * POLL_BACKOFF_FACTOR)
+        return self.interval
+
+    def failed_interval(self) -> timedelta:
+        """Return the interval until the next poll after a failed update."""
+        self._fast_until = 0.0
+        self.interval = self._clamp(self.interval * POLL_BACKOFF_FACTOR)
+        return self.interval
+
+    def _clamp(self, interval: timedelta) -> timedelta:
+        """Keep an interval within the configured bounds."""
+        return max(self.min_interval, min(self.max_interval, interval))
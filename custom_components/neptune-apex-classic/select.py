@@ -5,23 +5,30 @@ from __future__ import annotations
 import logging
 
 from neptune_apex_classic.connection import ApexConnection
-from neptune_apex_classic.outlet import Outlet, get_connected_outlets
+from neptune_apex_classic.outlet import Outlet
 
 from homeassistant.components.select import SelectEntity, SelectEntityDescription
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_NAME
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import DiscoveryInfoType
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
 from . import ApexBaseEntity
+from .commands import ApexCommandQueue
 from .const import (
+    ATTR_PENDING_STATE,
     CONFIG_KEY_SERIAL_NUMBER,
+    DATA_KEY_COMMAND_QUEUE,
     DATA_KEY_CONNECTION,
     DATA_KEY_COORDINATOR,
+    DATA_KEY_INVENTORY,
     DOMAIN,
+    SIGNAL_INVENTORY_ADDED,
 )
+from .coordinator import ApexDataUpdateCoordinator
+from .inventory import ApexInventoryChange
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -40,14 +47,23 @@ async def async_setup_entry(
     apex_data = hass.data[DOMAIN][serial_number]
     conn = apex_data[DATA_KEY_CONNECTION]
     coordinator = apex_data[DATA_KEY_COORDINATOR]
-
-    entities = []
-    for outlet in get_connected_outlets(conn):
-        # Exclude virtual outlets from having selection entities made. They are essentially read-only.
-        if outlet.device_id.startswith("Cntl") is False:
-            entities.append(
-                ApexOutletControl(conn, coordinator, name, serial_number, outlet)
-            )
+    inventory = apex_data[DATA_KEY_INVENTORY]
+    command_queue = apex_data[DATA_KEY_COMMAND_QUEUE]
+
+    def _create_controls(outlets: list[Outlet]) -> list[ApexOutletControl]:
+        """Create selection entities for the outlets which can be controlled."""
+        entities = []
+        for outlet in outlets:
+            # Exclude virtual outlets from having selection entities made. They are essentially read-only.
+            if outlet.device_id.startswith("Cntl") is False:
+                entities.append(
+                    ApexOutletControl(
+                        conn, coordinator, name, serial_number, outlet, command_queue
+                    )
+                )
+        return entities
+
+    entities = _create_controls(inventory.outlets)
 
     _LOGGER.debug(
         "Found %s controllable outlets for Apex at %s", len(entities), hostname
@@ -57,6 +73,20 @@ async def async_setup_entry(
 
     async_add_entities(entities)
 
+    @callback
+    def _async_add_outlets(change: ApexInventoryChange) -> None:
+        """Create selection entities for outlets the Apex started reporting."""
+        if change.outlets:
+            async_add_entities(_create_controls(change.outlets))
+
+    config.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_INVENTORY_ADDED.format(serial_number=serial_number),
+            _async_add_outlets,
+        )
+    )
+
 
 class ApexOutletControl(ApexBaseEntity, SelectEntity):
     """Apex outlet controller."""
@@ -64,44 +94,43 @@ class ApexOutletControl(ApexBaseEntity, SelectEntity):
     def __init__(
         self,
         conn: ApexConnection,
-        coordinator: DataUpdateCoordinator,
+        coordinator: ApexDataUpdateCoordinator,
         name: str,
         serial_number: str,
         outlet: Outlet,
+        command_queue: ApexCommandQueue,
     ) -> None:
         """Initialize the entity."""
         super().__init__(conn, coordinator, name, serial_number)
         self._outlet = outlet
+        self._command_queue = command_queue
+        self._status_key = outlet.device_id
         self.entity_description = SelectEntityDescription(
             key=f"{outlet.name}-{outlet.device_id}-state", name=outlet.name
         )
-
-    @property
-    def unique_id(self) -> str:
-        """Return this entity's unique ID."""
-        return f"{self._unique_id}/{self.entity_description.key}"
-
-    @property
-    def name(self) -> str:
-        """Return this entity's name."""
-        return f"{self._name} {self._outlet.name} - Set State"
-
-    @property
-    def current_option(self) -> str | None:
-        """Return this entity's currently selected option."""
-        value = self._outlet.value
+        self._attr_unique_id = f"{self._unique_id}/{self.entity_description.key}"
+        self._attr_name = f"{self._name} {outlet.name} - Set State"
+        self._attr_options = [Outlet.OFF, Outlet.AUTO, Outlet.ON]
+        self._async_update_attrs()
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Work out the selected option once per update."""
+        requested = self.coordinator.requested_outlet_state(self._status_key)
+        self._attr_extra_state_attributes = (
+            None if requested is None else {ATTR_PENDING_STATE: requested}
+        )
+        if requested is not None:
+            self._attr_current_option = requested
+            return
+        value = self.coordinator.data.outlets[self._status_key]
         if value in [Outlet.AUTO_OFF, Outlet.AUTO_ON]:
-            return str(Outlet.AUTO)
-        return str(value)  # Outlet.ON or Outlet.OFF
-
-    @property
-    def options(self) -> list[str]:
-        """Return the possible states for this entity."""
-        return [Outlet.OFF, Outlet.AUTO, Outlet.ON]
+            self._attr_current_option = str(Outlet.AUTO)
+        else:
+            self._attr_current_option = str(value)  # Outlet.ON or Outlet.OFF
 
     async def async_select_option(self, option: str) -> None:
         """Update the outlet state to the selected option."""
-        await self._outlet.set_state(option)
-
-        # Force a refresh to ensure that any displayed outlet binary sensors are updated
-        await self.async_update_ha_state(force_refresh=True)
+        # The queue shows the requested state on this entity and the outlet's binary
+        # sensor right away, or refreshes the coordinator once it has been sent
+        await self._command_queue.async_set_state(self._outlet, option)
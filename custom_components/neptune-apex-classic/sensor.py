@@ -2,37 +2,63 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
 import logging
+from typing import Any
 
 from neptune_apex_classic.connection import ApexConnection
-from neptune_apex_classic.probe import Probe, get_connected_probes
+from neptune_apex_classic.probe import Probe
 
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
     SensorStateClass,
 )
+from homeassistant.components.sensor.const import UNIT_CONVERTERS
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     CONF_HOST,
     CONF_NAME,
+    EntityCategory,
     UnitOfElectricCurrent,
     UnitOfElectricPotential,
+    UnitOfEnergy,
+    UnitOfPower,
     UnitOfTemperature,
+    UnitOfTime,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import DiscoveryInfoType
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util
 
 from . import ApexBaseEntity
+from .breaker import BreakerState
 from .const import (
+    ATTR_FAILURES,
+    ATTR_MAX,
+    ATTR_MIN,
+    ATTR_PERIOD_START,
+    ATTR_RETRY_IN,
     CONFIG_KEY_SERIAL_NUMBER,
     DATA_KEY_CONNECTION,
     DATA_KEY_COORDINATOR,
+    DATA_KEY_INVENTORY,
     DOMAIN,
+    HISTORY_PROBE_TYPES,
+    SIGNAL_INVENTORY_ADDED,
 )
+from .coordinator import ApexDataUpdateCoordinator
+from .energy import energy_key
+from .history import trend_key
+from .inventory import ApexInventoryChange
+from .metrics import RollingStatistic
+from .parser import probe_key
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -51,29 +77,88 @@ async def async_setup_entry(
     apex_data = hass.data[DOMAIN][serial_number]
     conn = apex_data[DATA_KEY_CONNECTION]
     coordinator = apex_data[DATA_KEY_COORDINATOR]
+    inventory = apex_data[DATA_KEY_INVENTORY]
 
+    entities = _create_probe_sensors(
+        conn, coordinator, name, serial_number, inventory.probes
+    )
+
+    _LOGGER.debug("Found %s probes for Apex at %s", len(entities), hostname)
+    if len(entities) == 0:
+        _LOGGER.warning("Apex at %s did not return any probes in its status", hostname)
+
+    entities.extend(
+        ApexDiagnosticSensor(conn, coordinator, name, serial_number, description)
+        for description in DIAGNOSTIC_SENSORS
+    )
+    async_add_entities(entities)
+
+    @callback
+    def _async_add_probes(change: ApexInventoryChange) -> None:
+        """Create sensor entities for probes the Apex started reporting."""
+        if change.probes:
+            async_add_entities(
+                _create_probe_sensors(
+                    conn, coordinator, name, serial_number, change.probes
+                )
+            )
+
+    config.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_INVENTORY_ADDED.format(serial_number=serial_number),
+            _async_add_probes,
+        )
+    )
+
+
+def _create_probe_sensors(
+    conn: ApexConnection,
+    coordinator: ApexDataUpdateCoordinator,
+    name: str,
+    serial_number: str,
+    probes: list[Probe],
+) -> list[ApexBaseEntity]:
+    """Create the sensor entity matching the type of each probe."""
     entities = list[ApexBaseEntity]()
-    for probe in get_connected_probes(conn):
+    for probe in probes:
+        sensor: ApexBaseEntity
         if probe.type == "Amps":
+            sensor = ApexCurrentSensor(conn, coordinator, name, serial_number, probe)
+        elif probe.type == "Temp":
+            sensor = ApexTempSensor(conn, coordinator, name, serial_number, probe)
+        elif probe.type == "ORP":
+            sensor = ApexORPSensor(conn, coordinator, name, serial_number, probe)
+        else:
+            sensor = ApexSensor(conn, coordinator, name, serial_number, probe)
+        entities.append(sensor)
+        if probe.type in HISTORY_PROBE_TYPES:
             entities.append(
-                ApexCurrentSensor(conn, coordinator, name, serial_number, probe)
+                ApexProbeTrendSensor(
+                    conn,
+                    coordinator,
+                    name,
+                    serial_number,
+                    probe,
+                    sensor.entity_description,
+                )
             )
-        elif probe.type == "Temp":
+        if probe.type == "Amps":
             entities.append(
-                ApexTempSensor(conn, coordinator, name, serial_number, probe)
+                ApexPowerSensor(conn, coordinator, name, serial_number, probe)
             )
-        elif probe.type == "ORP":
             entities.append(
-                ApexORPSensor(conn, coordinator, name, serial_number, probe)
+                ApexEnergySensor(conn, coordinator, name, serial_number, probe)
             )
-        else:
-            entities.append(ApexSensor(conn, coordinator, name, serial_number, probe))
+    return entities
 
-    _LOGGER.debug("Found %s probes for Apex at %s", len(entities), hostname)
-    if len(entities) == 0:
-        _LOGGER.warning("Apex at %s did not return any probes in its status", hostname)
 
-    async_add_entities(entities)
+def _reading(value: str) -> float | None:
+    """Convert a probe reading to a number, or None if the Apex sent something else."""
+    try:
+        return float(value)
+    except ValueError:
+        return None
 
 
 class ApexSensor(ApexBaseEntity, SensorEntity):
@@ -82,7 +167,7 @@ class ApexSensor(ApexBaseEntity, SensorEntity):
     def __init__(
         self,
         conn: ApexConnection,
-        coordinator: DataUpdateCoordinator,
+        coordinator: ApexDataUpdateCoordinator,
         name: str,
         serial_number: str,
         probe: Probe,
@@ -90,24 +175,19 @@ class ApexSensor(ApexBaseEntity, SensorEntity):
         """Initialize the entity."""
         super().__init__(conn, coordinator, name, serial_number)
         self._probe = probe
+        self._status_key = probe_key(probe.name, probe.type)
         self.entity_description = SensorEntityDescription(
-            key=f"{probe.name}-{probe.type}", name=probe.name
+            key=f"{probe.name}-{probe.type}",
+            name=probe.name,
         )
+        self._attr_unique_id = f"{self._unique_id}/{self.entity_description.key}"
+        self._attr_name = f"{self._name} {probe.name}"
+        self._async_update_attrs()
 
-    @property
-    def unique_id(self) -> str:
-        """Return this entity's unique ID."""
-        return f"{self._unique_id}/{self.entity_description.key}"
-
-    @property
-    def name(self) -> str:
-        """Return this entity's name."""
-        return f"{self._name} {self._probe.name}"
-
-    @property
-    def native_value(self) -> str:
-        """Return this entity's value."""
-        return str(self._probe.value)
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Convert the probe's value once per update."""
+        self._attr_native_value = self.coordinator.data.probes[self._status_key]
 
 
 class ApexORPSensor(ApexBaseEntity, SensorEntity):
@@ -116,7 +196,7 @@ class ApexORPSensor(ApexBaseEntity, SensorEntity):
     def __init__(
         self,
         conn: ApexConnection,
-        coordinator: DataUpdateCoordinator,
+        coordinator: ApexDataUpdateCoordinator,
         name: str,
         serial_number: str,
         probe: Probe,
@@ -124,6 +204,7 @@ class ApexORPSensor(ApexBaseEntity, SensorEntity):
         """Initialize the entity."""
         super().__init__(conn, coordinator, name, serial_number)
         self._probe = probe
+        self._status_key = probe_key(probe.name, probe.type)
         self.entity_description = SensorEntityDescription(
             key=f"{probe.name}-{probe.type}",
             name=probe.name,
@@ -132,21 +213,16 @@ class ApexORPSensor(ApexBaseEntity, SensorEntity):
             device_class=SensorDeviceClass.VOLTAGE,
             state_class=SensorStateClass.MEASUREMENT,
         )
-
-    @property
-    def unique_id(self) -> str:
-        """Return this entity's unique ID."""
-        return f"{self._unique_id}/{self.entity_description.key}"
-
-    @property
-    def name(self) -> str:
-        """Return this entity's name."""
-        return f"{self._name} {self._probe.name}"
-
-    @property
-    def native_value(self) -> float:
-        """Return this entity's value."""
-        return float(self._probe.value)
+        self._attr_unique_id = f"{self._unique_id}/{self.entity_description.key}"
+        self._attr_name = f"{self._name} {probe.name}"
+        self._async_update_attrs()
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Convert the probe's value once per update."""
+        self._attr_native_value = _reading(
+            self.coordinator.data.probes[self._status_key]
+        )
 
 
 class ApexCurrentSensor(ApexBaseEntity, SensorEntity):
@@ -155,7 +231,7 @@ class ApexCurrentSensor(ApexBaseEntity, SensorEntity):
     def __init__(
         self,
         conn: ApexConnection,
-        coordinator: DataUpdateCoordinator,
+        coordinator: ApexDataUpdateCoordinator,
         name: str,
         serial_number: str,
         probe: Probe,
@@ -163,7 +239,7 @@ class ApexCurrentSensor(ApexBaseEntity, SensorEntity):
         """Initialize the entity."""
         super().__init__(conn, coordinator, name, serial_number)
         self._probe = probe
-
+        self._status_key = probe_key(probe.name, probe.type)
         self.entity_description = SensorEntityDescription(
             key=f"{probe.name}-{probe.type}",
             name=probe.name,
@@ -172,21 +248,107 @@ class ApexCurrentSensor(ApexBaseEntity, SensorEntity):
             device_class=SensorDeviceClass.CURRENT,
             state_class=SensorStateClass.MEASUREMENT,
         )
+        self._attr_unique_id = f"{self._unique_id}/{self.entity_description.key}"
+        self._attr_name = f"{self._name} {probe.name}"
+        self._async_update_attrs()
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Convert the probe's value once per update."""
+        self._attr_native_value = _reading(
+            self.coordinator.data.probes[self._status_key]
+        )
 
-    @property
-    def unique_id(self) -> str:
-        """Return this entity's unique ID."""
-        return f"{self._unique_id}/{self.entity_description.key}"
 
-    @property
-    def name(self) -> str:
-        """Return this entity's name."""
-        return f"{self._name} {self._probe.name}"
+class ApexPowerSensor(ApexBaseEntity, SensorEntity):
+    """Power drawn through a current probe at the configured line voltage."""
+
+    def __init__(
+        self,
+        conn: ApexConnection,
+        coordinator: ApexDataUpdateCoordinator,
+        name: str,
+        serial_number: str,
+        probe: Probe,
+    ) -> None:
+        """Initialize the entity."""
+        super().__init__(conn, coordinator, name, serial_number)
+        self._probe = probe
+        self._status_key = probe_key(probe.name, probe.type)
+        self.entity_description = SensorEntityDescription(
+            key=f"{probe.name}-{probe.type}-power",
+            name=f"{probe.name} power",
+            icon="mdi:flash",
+            native_unit_of_measurement=UnitOfPower.WATT,
+            device_class=SensorDeviceClass.POWER,
+            state_class=SensorStateClass.MEASUREMENT,
+        )
+        self._attr_unique_id = f"{self._unique_id}/{self.entity_description.key}"
+        self._attr_name = f"{self._name} {self.entity_description.name}"
+        self._async_update_attrs()
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Convert the probe's current to power once per update."""
+        amps = _reading(self.coordinator.data.probes[self._status_key])
+        self._attr_native_value = (
+            None if amps is None else round(amps * self.coordinator.line_voltage, 1)
+        )
+
+
+class ApexEnergySensor(ApexBaseEntity, RestoreSensor):
+    """Energy drawn through a current probe, totaled from its power between polls.
+
+    The total is restored after a restart and keeps counting up from there.
+    """
+
+    def __init__(
+        self,
+        conn: ApexConnection,
+        coordinator: ApexDataUpdateCoordinator,
+        name: str,
+        serial_number: str,
+        probe: Probe,
+    ) -> None:
+        """Initialize the entity."""
+        super().__init__(conn, coordinator, name, serial_number)
+        self._probe = probe
+        self._probe_key = probe_key(probe.name, probe.type)
+        self._status_key = energy_key(self._probe_key)
+        self.entity_description = SensorEntityDescription(
+            key=f"{probe.name}-{probe.type}-energy",
+            name=f"{probe.name} energy",
+            icon="mdi:lightning-bolt",
+            native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+            device_class=SensorDeviceClass.ENERGY,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+        )
+        self._attr_unique_id = f"{self._unique_id}/{self.entity_description.key}"
+        self._attr_name = f"{self._name} {self.entity_description.name}"
+        self._async_update_attrs()
 
     @property
-    def native_value(self) -> float:
-        """Return this entity's value."""
-        return float(self._probe.value)
+    def _inventory_key(self) -> str | None:
+        """Return the key of the probe this entity totals."""
+        return self._probe_key
+
+    async def async_added_to_hass(self) -> None:
+        """Continue the total from where it was before the restart."""
+        await super().async_added_to_hass()
+        if (last := await self.async_get_last_sensor_data()) is None:
+            return
+        try:
+            total = float(last.native_value)
+        except (TypeError, ValueError):
+            return
+        self.coordinator.restore_energy(self._probe_key, total)
+        self._async_update_attrs()
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Show the total last published by the coordinator."""
+        meter = self.coordinator.energy.get(self._probe_key)
+        self._attr_native_value = 0.0 if meter is None else round(meter.published, 3)
 
 
 class ApexTempSensor(ApexBaseEntity, SensorEntity):
@@ -195,7 +357,7 @@ class ApexTempSensor(ApexBaseEntity, SensorEntity):
     def __init__(
         self,
         conn: ApexConnection,
-        coordinator: DataUpdateCoordinator,
+        coordinator: ApexDataUpdateCoordinator,
         name: str,
         serial_number: str,
         probe: Probe,
@@ -203,7 +365,7 @@ class ApexTempSensor(ApexBaseEntity, SensorEntity):
         """Initialize the entity."""
         super().__init__(conn, coordinator, name, serial_number)
         self._probe = probe
-
+        self._status_key = probe_key(probe.name, probe.type)
         self.entity_description = SensorEntityDescription(
             key=f"{probe.name}-{probe.type}",
             name=probe.name,
@@ -212,18 +374,239 @@ class ApexTempSensor(ApexBaseEntity, SensorEntity):
             device_class=SensorDeviceClass.TEMPERATURE,
             state_class=SensorStateClass.MEASUREMENT,
         )
+        self._attr_unique_id = f"{self._unique_id}/{self.entity_description.key}"
+        self._attr_name = f"{self._name} {probe.name}"
+        self._async_update_attrs()
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Convert the probe's value once per update."""
+        self._attr_native_value = _reading(
+            self.coordinator.data.probes[self._status_key]
+        )
+
+
+class ApexProbeTrendSensor(ApexBaseEntity, SensorEntity):
+    """Mean, minimum, and maximum of a probe's readings over the last finished period.
+
+    The state is only written once per period, so the probe's own sensor can be
+    left out of the recorder without losing its trend.
+    """
+
+    def __init__(
+        self,
+        conn: ApexConnection,
+        coordinator: ApexDataUpdateCoordinator,
+        name: str,
+        serial_number: str,
+        probe: Probe,
+        probe_description: SensorEntityDescription,
+    ) -> None:
+        """Initialize the entity."""
+        super().__init__(conn, coordinator, name, serial_number)
+        self._probe = probe
+        self._probe_key = probe_key(probe.name, probe.type)
+        self._status_key = trend_key(self._probe_key)
+        self._latest: dict[str, Any] | None = None
+        self.entity_description = SensorEntityDescription(
+            key=f"{probe_description.key}-trend",
+            name=f"{probe.name} trend",
+            icon=probe_description.icon,
+            native_unit_of_measurement=probe_description.native_unit_of_measurement,
+            device_class=probe_description.device_class,
+            state_class=SensorStateClass.MEASUREMENT,
+        )
+        self._attr_unique_id = f"{self._unique_id}/{self.entity_description.key}"
+        self._attr_name = f"{self._name} {self.entity_description.name}"
+        self._async_update_attrs()
 
     @property
-    def unique_id(self) -> str:
-        """Return this entity's unique ID."""
-        return f"{self._unique_id}/{self.entity_description.key}"
+    def _inventory_key(self) -> str | None:
+        """Return the key of the probe this entity summarizes."""
+        return self._probe_key
+
+    @callback
+    def _async_update_attrs(self) -> None:
+        """Show the aggregate of the period which just finished."""
+        history = self.coordinator.history.get(self._probe_key)
+        self._latest = None if history is None else history.latest()
+        self._attr_native_value = (
+            None if self._latest is None else round(self._latest["mean"], 2)
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the minimum and maximum in the unit the state is shown in."""
+        if self._latest is None:
+            return None
+        return {
+            ATTR_MIN: self._convert(self._latest["min"]),
+            ATTR_MAX: self._convert(self._latest["max"]),
+            ATTR_PERIOD_START: dt_util.utc_from_timestamp(
+                self._latest["start"]
+            ).isoformat(),
+        }
+
+    def _convert(self, value: float) -> float:
+        """Convert a reading from the probe's unit to the unit the state is shown in."""
+        native = self.native_unit_of_measurement
+        converter = UNIT_CONVERTERS.get(self.device_class)
+        if converter is None or self.hass is None or self.unit_of_measurement == native:
+            return value
+        return round(converter.convert(value, native, self.unit_of_measurement), 2)
+
+
+@dataclass
+class ApexDiagnosticSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor reporting how the integration itself is performing."""
+
+    value_fn: Callable[
+        [ApexDataUpdateCoordinator], float | int | str | None
+    ] = lambda _: None
+    # Rolling measurement summarized in the state attributes, if any
+    statistic_fn: Callable[[ApexDataUpdateCoordinator], RollingStatistic] | None = None
+    # Other state attributes, if any
+    attributes_fn: Callable[[ApexDataUpdateCoordinator], dict[str, Any]] | None = None
+
+
+def _timing_description(
+    key: str,
+    name: str,
+    statistic_fn: Callable[[ApexDataUpdateCoordinator], RollingStatistic],
+) -> ApexDiagnosticSensorEntityDescription:
+    """Describe a sensor showing the median of a rolling time measurement."""
+    return ApexDiagnosticSensorEntityDescription(
+        key=key,
+        name=name,
+        icon="mdi:timer-outline",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=1,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: statistic_fn(coordinator).percentile(50),
+        statistic_fn=statistic_fn,
+    )
+
+
+DIAGNOSTIC_SENSORS = (
+    ApexDiagnosticSensorEntityDescription(
+        key="skipped-writes",
+        name="Skipped state writes",
+        icon="mdi:content-save-off",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.skipped_writes,
+    ),
+    _timing_description(
+        "status-fetch-time",
+        "Status download time",
+        lambda coordinator: coordinator.conn.fetch_time,
+    ),
+    _timing_description(
+        "status-parse-time",
+        "Status parse time",
+        lambda coordinator: coordinator.conn.parse_time,
+    ),
+    _timing_description(
+        "update-time",
+        "Update time",
+        lambda coordinator: coordinator.update_time,
+    ),
+    _timing_description(
+        "data-lag",
+        "Data lag",
+        lambda coordinator: coordinator.data_lag,
+    ),
+    ApexDiagnosticSensorEntityDescription(
+        key="written-entities",
+        name="Entities written per update",
+        icon="mdi:content-save",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: coordinator.written_entities.percentile(50),
+        statistic_fn=lambda coordinator: coordinator.written_entities,
+    ),
+    ApexDiagnosticSensorEntityDescription(
+        key="circuit-breaker",
+        name="Circuit breaker",
+        icon="mdi:electric-switch",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        device_class=SensorDeviceClass.ENUM,
+        options=[state.value for state in BreakerState],
+        value_fn=lambda coordinator: coordinator.conn.breaker.state,
+        attributes_fn=lambda coordinator: {
+            ATTR_FAILURES: coordinator.conn.breaker.failures,
+            ATTR_RETRY_IN: round(coordinator.conn.breaker.retry_in()),
+        },
+    ),
+)
+
+
+class ApexDiagnosticSensor(ApexBaseEntity, SensorEntity):
+    """Measurement of the integration's own work, such as how long polls take.
+
+    Rolling measurements show their median as the state, with the 95th percentile
+    and latest sample as attributes.
+    """
+
+    entity_description: ApexDiagnosticSensorEntityDescription
+
+    def __init__(
+        self,
+        conn: ApexConnection,
+        coordinator: ApexDataUpdateCoordinator,
+        name: str,
+        serial_number: str,
+        description: ApexDiagnosticSensorEntityDescription,
+    ) -> None:
+        """Initialize the entity."""
+        super().__init__(conn, coordinator, name, serial_number)
+        self.entity_description = description
+        self._attr_unique_id = f"{self._unique_id}/{self.entity_description.key}"
+        self._attr_name = f"{self._name} {self.entity_description.name}"
+        # State and attributes last written, and the write waiting to run if any
+        self._written: tuple[Any, dict[str, Any] | None] | None = None
+        self._write: asyncio.Handle | None = None
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Drop a write still waiting to run."""
+        await super().async_will_remove_from_hass()
+        if self._write is not None:
+            self._write.cancel()
+            self._write = None
 
     @property
-    def name(self) -> str:
-        """Return this entity's name."""
-        return f"{self._name} {self._probe.name}"
+    def available(self) -> bool:
+        """Report measurements even while the Apex is unreachable."""
+        return True
 
     @property
-    def native_value(self) -> float:
+    def native_value(self) -> float | int | str | None:
         """Return this entity's value."""
-        return float(self._probe.value)
+        return self.entity_description.value_fn(self.coordinator)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the 95th percentile and latest sample of a rolling measurement."""
+        if self.entity_description.attributes_fn is not None:
+            return self.entity_description.attributes_fn(self.coordinator)
+        if self.entity_description.statistic_fn is None:
+            return None
+        statistic = self.entity_description.statistic_fn(self.coordinator)
+        return {"p95": statistic.percentile(95), "last": statistic.last}
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state once every other entity has been counted, if it changed."""
+        if self._write is None:
+            self._write = self.hass.loop.call_soon(self._async_write_if_changed)
+
+    @callback
+    def _async_write_if_changed(self) -> None:
+        """Write state only if the value or attributes shown changed."""
+        self._write = None
+        shown = (self.native_value, self.extra_state_attributes)
+        if shown == self._written:
+            return
+        self._written = shown
+        self.async_write_ha_state()
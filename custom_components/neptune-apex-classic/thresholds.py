@@ -0,0 +1,62 @@
+"""Thresholds on probe readings, evaluated with hysteresis on every poll."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from .const import (
+    THRESHOLD_HIGH,
+    THRESHOLD_HYSTERESIS,
+    THRESHOLD_LOW,
+    THRESHOLD_NORMAL,
+)
+
+
+def threshold_key(key: str) -> str:
+    """Return the key used to track the threshold level of the probe with a probe_key()."""
+    return f"{key}-threshold"
+
+
+@dataclass
+class ProbeThreshold:
+    """Low and high limits on a probe's readings.
+
+    A reading below `low` or above `high` crosses the threshold, and the reading has
+    to come back inside the limits by `hysteresis` before it counts as normal again,
+    so a reading hovering at a limit doesn't flap.
+    """
+
+    low: float | None = None
+    high: float | None = None
+    hysteresis: float = 0.0
+    # Level the last reading was at, or None before the first reading
+    level: str | None = None
+
+    @classmethod
+    def from_options(cls, options: dict[str, Any]) -> ProbeThreshold:
+        """Build a threshold from the options saved for a probe."""
+        return cls(
+            options.get(THRESHOLD_LOW),
+            options.get(THRESHOLD_HIGH),
+            options.get(THRESHOLD_HYSTERESIS, 0.0),
+        )
+
+    def evaluate(self, value: float) -> bool:
+        """Work out the level of a reading and return whether it changed."""
+        level = self.level
+        if level == THRESHOLD_LOW and value >= self.low + self.hysteresis:
+            level = THRESHOLD_NORMAL
+        elif level == THRESHOLD_HIGH and value <= self.high - self.hysteresis:
+            level = THRESHOLD_NORMAL
+        if level in (None, THRESHOLD_NORMAL):
+            if self.low is not None and value < self.low:
+                level = THRESHOLD_LOW
+            elif self.high is not None and value > self.high:
+                level = THRESHOLD_HIGH
+            else:
+                level = THRESHOLD_NORMAL
+
+        if level == self.level:
+            return False
+        self.level = level
+        return True